@@ -0,0 +1,243 @@
+# Benchmark of the cleaning pipeline on synthetic data, see generate_synthetic_data.py
+# Times every cleaning stage and the whole pipeline, records throughput and peak memory,
+# and compares the run against a stored baseline
+#
+#   python benchmark.py --apps 100000                  # run and compare against benchmarks/baseline.json
+#   python benchmark.py --apps 100000 --save-baseline  # run and store the result as the new baseline
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import pandas as pd
+from cleaning.instrumentation import peak_rss_mb
+from cleaning.merged import (add_script_flags, drop_duplicate_names, merge_sources, parse_release_dates,
+                             parse_requirements, script_columns)
+from cleaning.pipeline import Pipeline, default_outputs
+from cleaning.steam import *
+from cleaning.steamspy import clean_steamspy_chunk
+from cleaning.tags import build_tag_matrix
+from generate_synthetic_data import write_synthetic_data
+
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_stages(steam_path, steamspy_path):
+    """
+    Lists the cleaning stages in pipeline order, each as (name, input key, function, output key).
+    A stage reads its input from the shared state and stores its output there for the next stages,
+    the steps follow the cells of steam_cleaning.py and steamspy_cleaning.py.
+    Parameters:
+        steam_path (str): Path to the raw Steam data.
+        steamspy_path (str): Path to the raw SteamSpy data.
+    Returns:
+        list: The stages.
+    """
+    def drop_missing(df):
+        return prepare_steam(df, *plan_missing_data_drops(len(df), df.isna().sum()))
+
+    def remove_html(df):
+        # 'supported_languages' is already cleaned by prepare_steam, the descriptions go to the reviews
+        extract_reviews(df)
+        return df.drop(columns=review_cols)
+
+    def decode_literals(df):
+        return mark_free_prices(decode_literal_columns(df))
+
+    def developer_lists(df):
+        for col in ['developers', 'publishers']:
+            df[col] = df[col].astype(str)
+            df = string_to_list_cleaning(df, col)
+        return df
+
+    def languages(df):
+        masks = encode_languages(df['supported_languages'], pd.Index(steam_languages))
+        return df.join(masks).drop(columns=['supported_languages'])
+
+    def compact_steam(df):
+        return compact_dtypes(df.drop(columns='package_groups'), report=False)
+
+    def clean_steamspy(df):
+        return compact_dtypes(clean_steamspy_chunk(df), report=False)
+
+    def tag_matrix(df):
+        return build_tag_matrix(df['appid'], df['tags'])
+
+    def merge(state):
+        return drop_duplicate_names(merge_sources(state['steam'], state['steamspy']))
+
+    def script_flags(df):
+        return add_script_flags(df, script_columns)
+
+    return [
+        ('read_steam_csv', None, lambda _: pd.read_csv(steam_path), 'steam'),
+        ('read_steamspy_csv', None, lambda _: pd.read_csv(steamspy_path), 'steamspy'),
+        ('drop_missing', 'steam', drop_missing, 'steam'),
+        ('remove_html', 'steam', remove_html, 'steam'),
+        ('decode_literals', 'steam', decode_literals, 'steam'),
+        ('developer_lists', 'steam', developer_lists, 'steam'),
+        ('languages', 'steam', languages, 'steam'),
+        ('packages', 'steam', extract_package_info, 'packages'),
+        ('compact_steam', 'steam', compact_steam, 'steam'),
+        ('tag_matrix', 'steamspy', tag_matrix, 'tags'),
+        ('clean_steamspy', 'steamspy', clean_steamspy, 'steamspy'),
+        ('merge', None, merge, 'merged'),
+        ('script_flags', 'merged', script_flags, 'merged'),
+        ('release_dates', 'merged', parse_release_dates, 'merged'),
+        ('requirements', 'merged', parse_requirements, 'requirements'),
+    ]
+
+
+def measure(func, argument, trace_memory):
+    """
+    Runs a stage once.
+    Parameters:
+        func (callable): The stage function.
+        argument: Its input.
+        trace_memory (bool): Whether to record the peak of Python allocations, which slows the stage down.
+    Returns:
+        tuple: The output, the wall time in seconds and the peak memory in MB (None if not traced).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    output = func(argument)
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    return output, seconds, peak_mb
+
+
+def run_benchmark(steam_path, steamspy_path, trace_memory=True, repeat=3):
+    """
+    Times the whole pipeline, then every stage on the same data, keeping the fastest of repeat runs.
+    Stages are timed without memory tracing, then run once more under tracemalloc for the peak of their
+    Python allocations. The pipeline records the peak resident set size of the process instead.
+    Parameters:
+        steam_path (str): Path to the raw Steam data.
+        steamspy_path (str): Path to the raw SteamSpy data.
+        trace_memory (bool, optional): Whether to record the traced peak memory of every stage (default is True).
+        repeat (int, optional): Timed runs of the pipeline and of every stage (default is 3).
+    Returns:
+        dict: Seconds, rows in and out, throughput and peak memory ('peak_rss_mb' for the pipeline,
+              'traced_peak_mb' for the stages) of every stage and of the pipeline.
+    """
+    n_apps = sum(1 for _ in open(steam_path, 'rb')) - 1
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = Pipeline(steam_path, steamspy_path).run(default_outputs)
+        seconds.append(time.perf_counter() - start)
+        rows_out = len(outputs['df'])
+        del outputs
+    results = {'pipeline': {'seconds': min(seconds), 'rows_in': n_apps, 'rows_out': rows_out,
+                            'peak_rss_mb': peak_rss_mb()}}
+
+    state = {}
+    for name, input_key, func, output_key in build_stages(steam_path, steamspy_path):
+        argument = state if input_key is None else state[input_key]
+        copy = (lambda: argument) if input_key is None else argument.copy
+        seconds = []
+        for _ in range(repeat):
+            output, elapsed, _ = measure(func, copy(), trace_memory=False)
+            seconds.append(elapsed)
+        peak_mb = measure(func, copy(), trace_memory=True)[2] if trace_memory else None
+        rows_in = len(state['steam']) + len(state['steamspy']) if name == 'merge' else \
+            len(output) if input_key is None else len(argument)
+        results[name] = {'seconds': min(seconds), 'rows_in': rows_in, 'rows_out': len(output),
+                         'traced_peak_mb': peak_mb}
+        state[output_key] = output
+
+    for result in results.values():
+        result['rows_per_second'] = result['rows_in'] / result['seconds'] if result['seconds'] else None
+    return results
+
+
+# Peak memory of a result and its label: the pipeline measures the process, the stages their own allocations
+memory_metrics = {'peak_rss_mb': 'peak RSS', 'traced_peak_mb': 'traced'}
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, min_seconds=0.5):
+    """
+    Prints every stage next to the baseline. Memory is compared only with the same metric of the baseline.
+    Parameters:
+        results (dict): Stage results, see run_benchmark.
+        baseline (dict): Stage results of the baseline run.
+        tolerance (float, optional): Allowed relative slowdown or memory growth (default is 0.2, i.e., 20%).
+        min_seconds (float, optional): Stages whose time stays below this in both runs are too noisy to flag
+                                       (default is 0.5).
+    Returns:
+        list: Names of the stages slower or heavier than the baseline beyond the tolerance.
+    """
+    regressions = []
+    print(f"{'stage':<20}{'seconds':>10}{'baseline':>10}{'ratio':>8}{'rows/s':>12}"
+          f"{'memory MB':>11}{'baseline':>10}  metric")
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        metric = next((key for key in memory_metrics if key in result), None)
+        memory, base_memory = result.get(metric), base.get(metric)
+        ratio = result['seconds'] / base['seconds'] if base.get('seconds') else None
+        memory_ratio = memory / base_memory if memory and base_memory else None
+        flag = ''
+        slower = ratio and ratio > 1 + tolerance and max(result['seconds'], base['seconds']) > min_seconds
+        if slower or (memory_ratio and memory_ratio > 1 + tolerance):
+            regressions.append(name)
+            flag = '  <- regression'
+        print(f"{name:<20}{result['seconds']:>10.3f}{base.get('seconds', float('nan')):>10.3f}"
+              f"{ratio or float('nan'):>8.2f}{result['rows_per_second'] or 0:>12,.0f}"
+              f"{memory or float('nan'):>11.1f}{base_memory or float('nan'):>10.1f}  "
+              f"{memory_metrics.get(metric, '')}{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the cleaning stages on synthetic data.')
+    parser.add_argument('--apps', type=int, default=10_000, help='number of synthetic apps, 10k to 10M')
+    parser.add_argument('--work-dir', default=os.path.join(repo_dir, 'benchmarks', 'work'),
+                        help='directory holding the synthetic data and the pipeline outputs')
+    parser.add_argument('--baseline', default=os.path.join(repo_dir, 'benchmarks', 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--report', help='write the results of this run as JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced runs measuring peak memory')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage, the fastest is kept')
+    parser.add_argument('--min-seconds', type=float, default=0.5,
+                        help='stages faster than this in both runs are not flagged')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # The data is only generated again when the size or the seed changes
+    work_dir = os.path.abspath(args.work_dir)
+    baseline_path = os.path.abspath(args.baseline)
+    download_dir = os.path.join(work_dir, 'data', 'download')
+    marker = os.path.join(download_dir, 'synthetic.json')
+    config = {'apps': args.apps, 'seed': args.seed}
+    if not os.path.exists(marker) or json.load(open(marker)) != config:
+        print(f'Generating {args.apps:,} synthetic apps in {download_dir}')
+        write_synthetic_data(args.apps, download_dir, seed=args.seed)
+        json.dump(config, open(marker, 'w'))
+    os.chdir(work_dir)
+
+    results = run_benchmark(os.path.join(download_dir, 'steam_app_data.csv'),
+                            os.path.join(download_dir, 'steamspy_app_data.csv'), trace_memory=not args.no_memory,
+                            repeat=args.repeat)
+    run = {'apps': args.apps, 'seed': args.seed, 'python': platform.python_version(), 'pandas': pd.__version__,
+           'machine': platform.machine(), 'stages': results}
+
+    baseline = json.load(open(baseline_path)) if os.path.exists(baseline_path) else {}
+    if baseline and baseline.get('apps') != args.apps:
+        print(f"Baseline was measured on {baseline['apps']:,} apps, compare throughput rather than seconds")
+    regressions = compare_to_baseline(results, baseline.get('stages', {}), args.tolerance, args.min_seconds)
+    if args.report:
+        json.dump(run, open(args.report, 'w'), indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        json.dump(run, open(baseline_path, 'w'), indent=2)
+        print(f'Baseline saved to {baseline_path}')
+    elif regressions:
+        print('Regressions:', ', '.join(regressions))
+        sys.exit(1)
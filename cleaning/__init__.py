@@ -0,0 +1,5 @@
+# Cleaning of the scraped Steam and SteamSpy data as importable, side-effect-free stage functions
+#   cleaning.steam, cleaning.steamspy, cleaning.merged: the stage functions
+#   cleaning.pipeline: lazy stage graph running only what the requested outputs need
+#   python -m cleaning: command-line entry point, see cleaning/__main__.py
+from cleaning.pipeline import Pipeline, default_outputs, output_names
@@ -0,0 +1,71 @@
+# Command-line entry point of the cleaning pipeline
+#
+#   python -m cleaning                                  # every default output as Parquet in data/cleaned
+#   python -m cleaning --outputs package_df_steam       # only the stages the packages table needs
+#   python -m cleaning --format csv --workers 8 --report
+#   python -m cleaning --list                           # stages and what they read from
+import argparse
+import os
+from cleaning.instrumentation import RunReport
+from cleaning.pipeline import Pipeline, default_outputs, output_names
+from cleaning.tags import TagMatrix
+
+
+def write_outputs(results, output_dir, file_format):
+    """
+    Writes every output table, named after output_names. The tag matrix is written as a .npz file.
+    Parameters:
+        results (dict): Outputs by stage name, see Pipeline.run.
+        output_dir (str): Output directory.
+        file_format (str): 'parquet' or 'csv'.
+    Returns:
+        list: Paths of the written files.
+    """
+    tables = {output_names.get(name, name): frame for name, frame in results.items()}
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, matrix in [(name, table) for name, table in tables.items() if isinstance(table, TagMatrix)]:
+        paths.append(os.path.join(output_dir, f'{name}.npz'))
+        matrix.save(paths[-1])
+        del tables[name]
+    if file_format == 'parquet':
+        from cleaning.parquet_io import write_tables
+
+        return paths + write_tables(tables, output_dir)
+    for name, frame in tables.items():
+        paths.append(os.path.join(output_dir, f'{name}.csv'))
+        frame.to_csv(paths[-1], index=False)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cleaning', description='Clean the scraped Steam data.')
+    parser.add_argument('--steam', default='./data/download/steam_app_data.csv',
+                        help='raw Steam CSV, or a quoted glob of shards, e.g. "data/download/steam_app_data-*.csv.gz"')
+    parser.add_argument('--steamspy', default='./data/download/steamspy_app_data.csv',
+                        help='raw SteamSpy CSV, or a quoted glob of shards')
+    parser.add_argument('--outputs', nargs='+', default=default_outputs, help='stages whose output is written')
+    parser.add_argument('--output-dir', default='data/cleaned')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes of the row-local stages and threads reading the shards')
+    parser.add_argument('--report', action='store_true', help='write a run report to data/reports')
+    parser.add_argument('--profile', nargs='*', default=[], help='stages dumped with cProfile, implies --report')
+    parser.add_argument('--list', action='store_true', help='list the stages and exit')
+    args = parser.parse_args(argv)
+
+    report = RunReport('pipeline', profile_stages=args.profile) if args.report or args.profile else None
+    pipeline = Pipeline(args.steam, args.steamspy, n_workers=args.workers, report=report)
+    if args.list:
+        for name, (_, inputs) in pipeline.stages.items():
+            print(f"{name:<24}<- {', '.join(inputs) or 'file'}")
+        return
+    print('Running stages:', ', '.join(pipeline.plan(args.outputs)))
+    paths = write_outputs(pipeline.run(args.outputs), args.output_dir, args.format)
+    print('Written:', *paths, sep='\n  ')
+    if report:
+        print('Report:', *report.write(), sep='\n  ')
+
+
+if __name__ == '__main__':
+    main()
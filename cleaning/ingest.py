@@ -0,0 +1,213 @@
+# Ingestion of the raw scrapes: a single CSV or a glob of shards, plain or compressed (gzip, bz2, xz, zip, zstd)
+# Shards are decompressed and parsed in worker threads or processes, at most a few ahead of the consumer,
+# and every shard is read with the same dtype schema
+import collections
+import glob
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# pandas needs the zstandard package for these, pyarrow (already used for Parquet) decompresses them instead
+zstd_suffixes = ('.zst', '.zstd')
+
+
+def expand_shards(pattern):
+    """
+    Lists the shard files of a path or glob.
+    Parameters:
+        pattern (str or list): A file path, a glob such as './data/download/steam_app_data-*.csv.gz',
+                               or a list of either.
+    Returns:
+        list: Paths of the shards, each glob in sorted order.
+    Raises:
+        FileNotFoundError: If nothing matches.
+    """
+    patterns = [pattern] if isinstance(pattern, (str, os.PathLike)) else list(pattern)
+    paths = []
+    for item in map(os.fspath, patterns):
+        paths += [item] if os.path.isfile(item) else sorted(glob.glob(item))
+    if not paths:
+        raise FileNotFoundError(f'No file matches {pattern}')
+    return paths
+
+
+def infer_schema(frame):
+    """
+    Derives the dtype schema of the shards from the first one. Columns without a single value in it are read
+    as strings, and integer and boolean columns as nullable integers and booleans, so that later shards
+    holding values there, or missing some, still fit.
+    Parameters:
+        frame (pandas.DataFrame): The first shard.
+    Returns:
+        dict: dtype of every column, in column order.
+    """
+    schema = {}
+    for col, dtype in frame.dtypes.items():
+        if frame[col].isna().all():
+            dtype = 'str'
+        elif pd.api.types.is_bool_dtype(dtype):
+            dtype = 'boolean'
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtype = 'Int64'
+        schema[col] = dtype
+    return schema
+
+
+def open_shard(path):
+    """
+    Opens a shard for pandas.read_csv: zstd shards as a decompressing pyarrow stream, others by path,
+    pandas decompressing them according to their extension.
+    """
+    if path.endswith(zstd_suffixes):
+        import pyarrow as pa
+
+        return pa.input_stream(path, compression='zstd')
+    return path
+
+
+def read_shard(path, schema=None, **kwargs):
+    """
+    Reads one shard, decompressed according to its extension.
+    Parameters:
+        path (str): Path of the shard, e.g. 'steam_app_data-00001.csv.gz'.
+        schema (dict, optional): dtype of every column, see infer_schema (default is none, i.e., inferred).
+        **kwargs: Passed on to pandas.read_csv.
+    Returns:
+        pandas.DataFrame: The shard.
+    Raises:
+        ValueError: If the shard does not match the schema.
+    """
+    source = open_shard(path)
+    try:
+        frame = pd.read_csv(source, dtype=schema, **kwargs)
+    except (ValueError, TypeError) as error:
+        if schema is None:
+            raise
+        raise ValueError(f"Shard '{path}' does not match the schema: {error}") from error
+    finally:
+        if source is not path:
+            source.close()
+    if schema is not None and list(frame.columns) != list(schema):
+        raise ValueError(f"Shard '{path}' has columns {list(frame.columns)}, expected {list(schema)}")
+    return frame
+
+
+def load_shard(path, schema=None, func=None, **kwargs):
+    """
+    Reads one shard and applies the row-local stage to it, runs in the workers of iter_shards.
+    """
+    frame = read_shard(path, schema, **kwargs)
+    return func(frame) if func else frame
+
+
+def iter_shards(pattern, func=None, schema=None, n_workers=4, prefetch=None, processes=False, **kwargs):
+    """
+    Streams the shards in order. The first shard is read alone to fix the schema, the others are read
+    in a pool, with at most prefetch shards waiting for the consumer so that memory stays bounded.
+    A single file keeps the dtypes pandas infers.
+    Parameters:
+        pattern (str or list): Path, glob or list of them, see expand_shards.
+        func (callable, optional): Row-local stage applied to every shard in the workers, e.g.
+                                   clean_steamspy_chunk, must be a module-level function with processes
+                                   (default is none).
+        schema (dict, optional): dtype of every column (default is the schema of the first shard, see infer_schema).
+        n_workers (int, optional): Number of workers, 1 reads the shards one after the other (default is 4).
+        prefetch (int, optional): Shards read ahead of the consumer (default is n_workers).
+        processes (bool, optional): Whether the workers are processes instead of threads. Threads suit
+                                    decompression and parsing, processes suit a CPU-bound func (default is False).
+        **kwargs: Passed on to pandas.read_csv.
+    Yields:
+        pandas.DataFrame: Every shard, or the output of func for every shard.
+    """
+    paths = expand_shards(pattern)
+    first = read_shard(paths[0], schema, **kwargs)
+    if schema is None and len(paths) > 1:
+        schema = infer_schema(first)
+        first = first.astype(schema)
+    if n_workers < 2 or len(paths) < 2:
+        yield func(first) if func else first
+        for path in paths[1:]:
+            yield load_shard(path, schema, func, **kwargs)
+        return
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=n_workers) as pool:
+        remaining = iter(paths[1:])
+        pending = collections.deque(pool.submit(load_shard, path, schema, func, **kwargs)
+                                    for path in itertools.islice(remaining, prefetch or n_workers))
+        yield func(first) if func else first
+        del first
+        while pending:
+            result = pending.popleft().result()
+            path = next(remaining, None)
+            if path is not None:
+                pending.append(pool.submit(load_shard, path, schema, func, **kwargs))
+            yield result
+
+
+def concat_frames(frames, ignore_index=False):
+    """
+    Concatenates partitions or shards of the same columns. Categorical columns keep a categorical dtype
+    over the union of their categories, where pandas.concat falls back to strings when they differ.
+    Parameters:
+        frames (list): DataFrames with the same columns.
+        ignore_index (bool, optional): Whether to number the rows anew (default is False).
+    Returns:
+        pandas.DataFrame: The concatenated frames.
+    """
+    columns = frames[0].columns
+    categorical = [col for col in columns if all(isinstance(frame[col].dtype, pd.CategoricalDtype)
+                                                 for frame in frames)] \
+        if all(frame.columns.equals(columns) for frame in frames) else []
+    result = pd.concat([frame.drop(columns=categorical) for frame in frames], ignore_index=ignore_index)
+    for col in categorical:
+        result.insert(columns.get_loc(col), col, union_categoricals([frame[col].array for frame in frames]))
+    return result
+
+
+def read_shards(pattern, func=None, n_workers=4, **kwargs):
+    """
+    Reads every shard into one DataFrame, see iter_shards. A single plain CSV is read like pandas.read_csv.
+    Parameters:
+        pattern (str or list): Path, glob or list of them, e.g. './data/download/steam_app_data-*.csv.zst'.
+        func (callable, optional): Row-local stage applied to every shard (default is none).
+        n_workers (int, optional): Number of workers (default is 4).
+        **kwargs: Passed on to iter_shards.
+    Returns:
+        pandas.DataFrame or tuple: The concatenated shards, or the concatenated outputs of func.
+    """
+    results = list(iter_shards(pattern, func, n_workers=n_workers, **kwargs))
+    if len(results) == 1:
+        return results[0]
+    if isinstance(results[0], tuple):
+        return tuple(concat_frames(frames, ignore_index=True) for frames in zip(*results))
+    return concat_frames(results, ignore_index=True)
+
+
+def iter_chunks(pattern, chunksize=50_000, func=None, n_workers=1):
+    """
+    Streams the raw data in bounded pieces: a single file in chunks of chunksize rows, shards one by one
+    as they come, see iter_shards. With several workers the shards are read and passed through func
+    in worker processes.
+    Parameters:
+        pattern (str or list): Path, glob or list of them, see expand_shards.
+        chunksize (int, optional): Rows per chunk of a single file (default is 50 000).
+        func (callable, optional): Row-local stage applied to every chunk, a module-level function
+                                   or a partial of one (default is none).
+        n_workers (int, optional): Number of worker processes for shards (default is 1).
+    Yields:
+        pandas.DataFrame: Every chunk, or the output of func for every chunk.
+    """
+    paths = expand_shards(pattern)
+    if len(paths) > 1:
+        yield from iter_shards(paths, func, n_workers=n_workers, processes=n_workers > 1)
+        return
+    source = open_shard(paths[0])
+    try:
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            yield func(chunk) if func else chunk
+    finally:
+        if source is not paths[0]:
+            source.close()
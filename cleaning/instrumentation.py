@@ -0,0 +1,183 @@
+# Instrumentation of the cleaning stages
+# Every named stage records wall and CPU time, memory and the shape of its input and output,
+# and the run is exported as a JSON and a CSV report. Cheap enough to stay on in production:
+# tracemalloc, deep memory footprints and cProfile are opt-in.
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import pandas as pd
+
+
+def current_rss_mb():
+    """
+    Returns the current resident set size of the process in MB, or None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the process so far in MB, or None where the resource module
+    is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux reports it in KB, macOS in bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def describe_frame(data, deep=False):
+    """
+    Shape and memory footprint of a stage input or output.
+    Parameters:
+        data: A DataFrame, a Series, a tuple whose first DataFrame is described (e.g. clean_steam_chunk),
+              or an array-like object with a shape and nbytes (e.g. cleaning.tags.TagMatrix).
+        deep (bool, optional): Whether to measure the strings of object columns, which scans every value
+                               (default is False).
+    Returns:
+        tuple: Number of rows, number of columns and memory in MB, all None for other objects.
+    """
+    if isinstance(data, tuple):
+        data = next((item for item in data if isinstance(item, (pd.DataFrame, pd.Series))), None)
+    if isinstance(data, pd.DataFrame):
+        return len(data), data.shape[1], data.memory_usage(index=True, deep=deep).sum() / 1024 ** 2
+    if isinstance(data, pd.Series):
+        return len(data), 1, data.memory_usage(index=True, deep=deep) / 1024 ** 2
+    if hasattr(data, 'shape') and hasattr(data, 'nbytes') and len(data.shape) == 2:
+        return data.shape[0], data.shape[1], data.nbytes / 1024 ** 2
+    return None, None, None
+
+
+class RunReport:
+    """
+    Collects one record per cleaning stage of a run.
+    Parameters:
+        name (str, optional): Name of the run, used in the report file names (default is 'cleaning').
+        output_dir (str, optional): Directory of the reports and profiles (default is 'data/reports').
+        profile_stages (iterable, optional): Stages run under cProfile, each dumped to
+                                             '<output_dir>/<run>_<stage>.prof' (default is none).
+        trace_memory (bool, optional): Whether to record the peak of Python allocations per stage with tracemalloc,
+                                       which slows pure-Python stages down (default is False).
+        deep_memory (bool, optional): Whether the memory footprints include the strings of object columns
+                                      (default is False).
+    """
+
+    def __init__(self, name='cleaning', output_dir='data/reports', profile_stages=(), trace_memory=False,
+                 deep_memory=False):
+        self.name = name
+        self.output_dir = output_dir
+        self.profile_stages = set(profile_stages)
+        self.trace_memory = trace_memory
+        self.deep_memory = deep_memory
+        self.started = datetime.now()
+        self.run_id = f"{name}_{self.started.strftime('%Y%m%d_%H%M%S')}"
+        self.records = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, data=None):
+        """
+        Records the block of code of a stage. Set record['output'] to the result to record its shape.
+
+            with run_report.stage('replace_missing', df_steam) as record:
+                ...
+                record['output'] = df_steam
+
+        Parameters:
+            name (str): Name of the stage.
+            data (optional): Input of the stage, e.g. a DataFrame.
+        Yields:
+            dict: The record of the stage.
+        """
+        rows_in, cols_in, memory_in = describe_frame(data, self.deep_memory)
+        record = {'stage': name, 'started': datetime.now().isoformat(timespec='seconds'),
+                  'rows_in': rows_in, 'cols_in': cols_in, 'memory_in_mb': memory_in}
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+        peak_before = peak_rss_mb()
+        if self.trace_memory:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if profiler:
+            profiler.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except BaseException as error:
+            record['error'] = f'{type(error).__name__}: {error}'
+            raise
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            if profiler:
+                profiler.disable()
+                os.makedirs(self.output_dir, exist_ok=True)
+                record['profile'] = os.path.join(self.output_dir, f'{self.run_id}_{name}.prof')
+                profiler.dump_stats(record['profile'])
+            if self.trace_memory:
+                record['traced_peak_mb'] = (tracemalloc.get_traced_memory()[1] - traced_before) / 1024 ** 2
+            record['rss_mb'] = current_rss_mb()
+            record['peak_rss_mb'] = peak_rss_mb()
+            record['peak_rss_growth_mb'] = None if peak_before is None else record['peak_rss_mb'] - peak_before
+            output = record.pop('output', None)
+            record['rows_out'], record['cols_out'], record['memory_out_mb'] = describe_frame(output, self.deep_memory)
+            self.records.append(record)
+
+    def run(self, name, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) as a stage, the first argument being its input.
+        Parameters:
+            name (str): Name of the stage.
+            func (callable): The stage function.
+        Returns:
+            The result of func.
+        """
+        with self.stage(name, args[0] if args else None) as record:
+            output = record['output'] = func(*args, **kwargs)
+        return output
+
+    def to_frame(self):
+        """
+        Returns:
+            pandas.DataFrame: One row per recorded stage, in the order they ran.
+        """
+        columns = ['stage', 'started', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'cols_in', 'cols_out',
+                   'memory_in_mb', 'memory_out_mb', 'rss_mb', 'peak_rss_mb', 'peak_rss_growth_mb']
+        if self.trace_memory:
+            columns.append('traced_peak_mb')
+        frame = pd.DataFrame(self.records, columns=columns + ['profile', 'error'])
+        counts = ['rows_in', 'rows_out', 'cols_in', 'cols_out']
+        frame[counts] = frame[counts].astype('Int64')
+        return frame.dropna(axis=1, how='all').round(4)
+
+    def write(self):
+        """
+        Writes the report as '<output_dir>/<run_id>.json' and '<output_dir>/<run_id>.csv'.
+        Writing again during the same run overwrites the files with every stage recorded so far.
+        Returns:
+            tuple: Paths of the JSON and CSV reports.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        frame = self.to_frame()
+        json_path = os.path.join(self.output_dir, f'{self.run_id}.json')
+        csv_path = os.path.join(self.output_dir, f'{self.run_id}.csv')
+        report = {'run': self.run_id, 'started': self.started.isoformat(timespec='seconds'),
+                  'wall_s': round(time.time() - self.started.timestamp(), 4),
+                  'python': platform.python_version(), 'pandas': pd.__version__,
+                  'stages': json.loads(frame.to_json(orient='records'))}
+        with open(json_path, 'w') as file:
+            json.dump(report, file, indent=2)
+        frame.to_csv(csv_path, index=False)
+        return json_path, csv_path
@@ -0,0 +1,440 @@
+# Stage functions of the merged Steam and SteamSpy data: the merge itself, script detection,
+# release dates, requirements and the incremental refresh. Free of side effects
+import os
+import re
+import numpy as np
+import pandas as pd
+from cleaning.ingest import read_shards
+from cleaning.steam import clean_steam_chunk, compact_dtypes, plan_missing_data_drops
+from cleaning.steamspy import clean_steamspy_chunk
+
+
+steam_cols = ['name', 'steam_appid', 'required_age', 'is_free',
+              'minimum_req', 'recommended_req', 'developers', 'publishers',
+              'date_str', 'windows', 'linux', 'mac', 'text_languages',
+              'audio_languages', 'number_of_achievements', 'achievements_status']
+
+steamspy_cols = ['appid', 'positive', 'negative', 'approx_owners', 'owners_low', 'owners_high',
+                 'average_forever', 'average_2weeks', 'median_forever',
+                 'median_2weeks', 'genre', 'ccu']
+# Bumped when the merge output changes, so that incremental caches of older merges are rebuilt
+merge_version = 5
+
+
+def build_appid_index(appids):
+    """
+    Builds a sorted int64 index of appids, for positional lookups.
+    Parameters:
+        appids (pandas.Series): Appid column, e.g. 'steam_appid' or 'appid'.
+    Returns:
+        tuple: The sorted appids (int64 array) and the row position of each of them (int64 array).
+    """
+    keys = pd.to_numeric(appids, errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    return keys[order], order
+
+
+def lookup_appids(index, appids):
+    """
+    Finds the row of every appid in an index from build_appid_index. Duplicated appids resolve to their first row.
+    Parameters:
+        index (tuple): Sorted appids and their row positions.
+        appids (numpy.ndarray): int64 appids to look up.
+    Returns:
+        numpy.ndarray: Row position of every appid, -1 where it is missing from the index.
+    """
+    sorted_keys, order = index
+    if not len(sorted_keys):
+        return np.full(len(appids), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_keys, appids), len(sorted_keys) - 1)
+    return np.where(sorted_keys[positions] == appids, order[positions], -1)
+
+
+def take_rows(series, positions):
+    """
+    Takes rows of a column by position, -1 giving a missing value. NumPy integer and boolean columns become
+    their nullable counterparts instead of floats and objects.
+    Parameters:
+        series (pandas.Series): Column to take from.
+        positions (numpy.ndarray): Row positions, -1 for missing.
+    Returns:
+        pandas.Series: The taken values, with a default index.
+    """
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        series = series.astype(series.dtype.name.replace('int', 'Int').replace('uInt', 'UInt'))
+    elif pd.api.types.is_bool_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        series = series.astype('boolean')
+    return pd.Series(series.array.take(positions, allow_fill=True), name=series.name)
+
+
+def join_coverage(steam_appids, steamspy_appids, positions):
+    """
+    Statistics of the appid join.
+    Parameters:
+        steam_appids (numpy.ndarray): int64 Steam appids.
+        steamspy_appids (numpy.ndarray): int64 SteamSpy appids.
+        positions (numpy.ndarray): SteamSpy row of every Steam app, see lookup_appids.
+    Returns:
+        dict: App counts per source, matched apps, apps found in one source only, duplicated appids
+              and the share of Steam apps with SteamSpy data.
+    """
+    matched = int((positions >= 0).sum())
+    unique_steamspy = np.unique(steamspy_appids)
+    return {
+        'steam_apps': len(steam_appids),
+        'steamspy_apps': len(steamspy_appids),
+        'matched': matched,
+        'steam_only': len(steam_appids) - matched,
+        'steamspy_only': int((~np.isin(unique_steamspy, steam_appids)).sum()),
+        'duplicate_steam_appids': len(steam_appids) - len(np.unique(steam_appids)),
+        'duplicate_steamspy_appids': len(steamspy_appids) - len(unique_steamspy),
+        'coverage': matched / len(steam_appids) if len(steam_appids) else 1.0,
+    }
+
+
+def merge_sources(df_steam, df_steamspy, report=False):
+    """
+    Left-joins the cleaned SteamSpy columns onto the cleaned Steam columns by appid, as a positional lookup
+    in a sorted int64 appid index. Apps missing from SteamSpy are kept with missing SteamSpy values and
+    flagged in 'steamspy_missing'.
+    Parameters:
+        df_steam (pandas.DataFrame): Cleaned Steam data.
+        df_steamspy (pandas.DataFrame): Cleaned SteamSpy data.
+        report (bool, optional): Print the join coverage, see join_coverage (default is False).
+    Returns:
+        pandas.DataFrame: Every Steam app with its SteamSpy columns, with a default index.
+    """
+    steam_appids = pd.to_numeric(df_steam['steam_appid'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    index = build_appid_index(df_steamspy['appid'])
+    positions = lookup_appids(index, steam_appids)
+    df = df_steam[steam_cols].reset_index(drop=True)
+    df['steam_appid'] = steam_appids
+    for col in steamspy_cols[1:]:
+        df[col] = take_rows(df_steamspy[col], positions)
+    df['steamspy_missing'] = positions < 0
+    if report:
+        coverage = join_coverage(steam_appids, index[0], positions)
+        print(', '.join(f'{key}: {value:.1%}' if key == 'coverage' else f'{key}: {value:,}'
+                        for key, value in coverage.items()))
+    return df
+
+
+def name_keys(names):
+    """
+    Normalizes names for deduplication: Unicode NFKC, case folded, whitespace collapsed.
+    Parameters:
+        names (pandas.Series): App names.
+    Returns:
+        pandas.Series: Normalized name per row.
+    """
+    keys = names.astype(str).str.normalize('NFKC').str.casefold()
+    return keys.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def drop_duplicate_names(df):
+    """
+    Keeps the app with the lowest appid of every normalized name, see name_keys, whatever the row order.
+    Parameters:
+        df (pandas.DataFrame): Merged data with 'name' and 'steam_appid' columns.
+    Returns:
+        pandas.DataFrame: The deduplicated data, rows in their input order.
+    """
+    order = np.argsort(df['steam_appid'].to_numpy(), kind='stable')
+    keep = np.empty(len(df), dtype=bool)
+    keep[order] = ~name_keys(df['name'].iloc[order]).duplicated().to_numpy()
+    return df[keep]
+
+
+# Text in other scripts needs translation. Detecting scripts per column with compiled Unicode ranges:
+# one pass finds the values with any non-Latin character, only those are classified by script
+script_ranges = {
+    'cjk': '\u3040-\u30ff\u3100-\u312f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\U00020000-\U0002ebef',
+    'cyrillic': '\u0400-\u052f',
+    'greek': '\u0370-\u03ff',
+    'arabic': '\u0600-\u06ff\u0750-\u077f',
+    'hebrew': '\u0590-\u05ff',
+    'thai': '\u0e00-\u0e7f',
+}
+script_patterns = {script: re.compile(f'[{chars}]') for script, chars in script_ranges.items()}
+other_script_pattern = re.compile(f"[{''.join(script_ranges.values())}]")
+# Columns flagged in the merged output
+script_columns = ['name', 'date_str', 'minimum_req', 'recommended_req']
+
+
+def detect_scripts(series):
+    """
+    Flags the scripts used in every value of a column. List and tuple values are joined first,
+    categorical columns are scanned once per category.
+    Parameters:
+        series (pandas.Series): Text, list or categorical column.
+    Returns:
+        pandas.Series: uint8 bitmask per row, bit i set when the value contains the i-th script of script_ranges.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        category_flags = detect_scripts(pd.Series(series.cat.categories, dtype=object)).to_numpy()
+        codes = series.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, category_flags[codes], 0).astype(np.uint8), index=series.index)
+    text = series.map(lambda value: ' '.join(map(str, value)) if isinstance(value, (list, tuple)) else value)
+    text = text.astype(str)
+    flags = np.zeros(len(text), dtype=np.uint8)
+    candidates = text.str.contains(other_script_pattern).to_numpy(dtype=bool)
+    for bit, pattern in enumerate(script_patterns.values()):
+        found = text[candidates].str.contains(pattern).to_numpy(dtype=bool)
+        flags[candidates] |= found.astype(np.uint8) << bit
+    return pd.Series(flags, index=series.index)
+
+
+def add_script_flags(df, columns):
+    """
+    Adds a '<column>_scripts' bitmask column for every column, so later steps can route rows without rescanning.
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        columns (list): Columns to scan.
+    Returns:
+        pandas.DataFrame: A new DataFrame with the script flag columns, the input is left unchanged.
+    """
+    return df.assign(**{f'{col}_scripts': detect_scripts(df[col]) for col in columns})
+
+
+def script_mask(df, columns, script='cjk'):
+    """
+    Rows where any of the columns contains the script, computed from the flag columns.
+    Parameters:
+        df (pandas.DataFrame): DataFrame with flag columns from add_script_flags.
+        columns (list): Flagged columns to check.
+        script (str, optional): A key of script_ranges (default is 'cjk').
+    Returns:
+        pandas.Series: Boolean mask.
+    """
+    bit = np.uint8(1 << list(script_ranges).index(script))
+    flags = np.bitwise_or.reduce([df[f'{col}_scripts'].to_numpy() for col in columns])
+    return pd.Series((flags & bit) != 0, index=df.index)
+
+
+def finish_merged(merged):
+    """
+    Row-local steps after the merge: script flags of script_columns and release dates. Shared by the full
+    pipeline and the incremental refresh, so that both produce the same columns.
+    Parameters:
+        merged (pandas.DataFrame): Output of merge_sources.
+    Returns:
+        pandas.DataFrame: The data with '<column>_scripts', 'release_date' and 'release_date_status' columns.
+    """
+    return parse_release_dates(add_script_flags(merged, script_columns))
+
+
+# Release dates come in several formats, some localized, and thousands of apps share a day.
+# Every distinct string is parsed once: a single regex sorts them into format buckets,
+# each bucket is parsed with one vectorized to_datetime call, and results are mapped back
+date_pattern = re.compile(r"""^(?:
+    (?P<day_month_year>\d{1,2}\.?\s[^\W\d_]{3,}\.?,?\s\d{4})          # '9 jul, 2013', '9. juli 2013'
+    |(?P<month_day_year>[^\W\d_]{3,}\.?\s\d{1,2},?\s\d{4})            # 'jul 9, 2013'
+    |(?P<month_year>[^\W\d_]{3,}\.?,?\s\d{4})                         # 'jul 2013'
+    |(?P<year_month_day>\d{4}\s?[年년./-]\s?\d{1,2}\s?[月월./-]\s?\d{1,2}\s?[日일]?)  # '2014 年 3 月 5 日'
+    |(?P<coming_soon>coming\ssoon|to\sbe\sannounced|tba|tbd|即将推出|即將推出|近日登場|출시\s예정)
+)$""", re.VERBOSE)
+date_formats = {
+    'day_month_year': '%d %b %Y',
+    'month_day_year': '%b %d %Y',
+    'month_year': '%b %Y',
+    'year_month_day': '%Y %m %d',
+}
+# Localized month names by their first four, then three letters
+localized_months = {
+    'jan': 'jan', 'feb': 'feb', 'mar': 'mar', 'apr': 'apr', 'may': 'may', 'jun': 'jun',
+    'jul': 'jul', 'aug': 'aug', 'sep': 'sep', 'oct': 'oct', 'nov': 'nov', 'dec': 'dec',
+    'mär': 'mar', 'mai': 'may', 'okt': 'oct', 'dez': 'dec',                             # German, Portuguese
+    'janv': 'jan', 'févr': 'feb', 'fév': 'feb', 'avr': 'apr', 'juin': 'jun', 'juil': 'jul',
+    'août': 'aug', 'aoû': 'aug', 'déc': 'dec',                                          # French
+    'ene': 'jan', 'abr': 'apr', 'ago': 'aug', 'dic': 'dec',                             # Spanish
+    'fev': 'feb', 'set': 'sep', 'out': 'oct',                                           # Portuguese
+    'янв': 'jan', 'фев': 'feb', 'мар': 'mar', 'апр': 'apr', 'мая': 'may', 'май': 'may',
+    'июн': 'jun', 'июл': 'jul', 'авг': 'aug', 'сен': 'sep', 'окт': 'oct', 'ноя': 'nov', 'дек': 'dec',  # Russian
+}
+month_word = re.compile(r'[^\W\d_]+\.?')
+date_status = pd.CategoricalDtype(['day', 'month', 'coming_soon', 'missing', 'unparsed'])
+
+
+def normalize_date_string(date_str):
+    """
+    Lowercases a date string, removes punctuation and replaces localized month names by English abbreviations.
+    Parameters:
+        date_str (str): A distinct release date string.
+    Returns:
+        str: The normalized string, unknown words are left as they are.
+    """
+    def month(match):
+        word = match.group(0).rstrip('.')
+        return localized_months.get(word[:4], localized_months.get(word[:3], word))
+    date_str = month_word.sub(month, date_str.strip().lower())
+    return re.sub(r'\s+', ' ', re.sub(r'[,.]', ' ', date_str)).strip()
+
+
+def parse_release_dates(df):
+    """
+    Parses 'date_str' into a datetime 'release_date' column and a 'release_date_status' categorical:
+    'day' or 'month' precision, 'coming_soon', 'missing' or 'unparsed'.
+    Parameters:
+        df (pandas.DataFrame): Merged data with a 'date_str' column.
+    Returns:
+        pandas.DataFrame: A new DataFrame with 'release_date' and 'release_date_status' columns.
+    """
+    codes, uniques = pd.factorize(df['date_str'].astype(object))
+    dates = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[ns]')
+    status = pd.Series('unparsed', index=dates.index, dtype=object)
+    raw = pd.Series(uniques, dtype=object)
+    missing = raw.isna() | raw.astype(str).str.strip().isin(['', 'nan', 'unknown'])
+    status[missing] = 'missing'
+
+    buckets = raw[~missing].astype(str).str.strip().str.lower().str.extract(date_pattern)
+    bucket = buckets.notna().idxmax(axis=1).where(buckets.notna().any(axis=1))
+    status[bucket.index[bucket == 'coming_soon']] = 'coming_soon'
+    for name, date_format in date_formats.items():
+        rows = bucket.index[bucket == name]
+        if not len(rows):
+            continue
+        strings = raw[rows].map(normalize_date_string)
+        if name == 'year_month_day':
+            strings = strings.str.replace(r'\D+', ' ', regex=True).str.strip()
+        parsed = pd.to_datetime(strings, format=date_format, errors='coerce')
+        dates[rows] = parsed
+        status[rows[parsed.notna().to_numpy()]] = 'month' if name == 'month_year' else 'day'
+
+    # Missing strings have code -1, which takes the padding value appended after the distinct strings
+    release_dates = np.append(dates.to_numpy(), np.datetime64('NaT', 'ns'))[codes]
+    release_status = np.append(status.to_numpy(), 'missing')[codes]
+    return df.assign(release_date=release_dates, release_date_status=pd.Categorical(release_status, dtype=date_status))
+
+
+# Requirements are one string per app, e.g. 'Minimum:OS: Windows 7Processor: 2 GHzMemory: 4 GB RAM...'
+# Splitting on every known label at once, so a missing label does not hide the fields after it
+requirement_labels = {
+    'OS': 'os', 'Processor': 'processor', 'Memory': 'memory', 'Graphics': 'graphics', 'DirectX': 'directx',
+    'Network': 'network', 'Storage': 'storage', 'Hard Drive': 'storage', 'Hard Disk Space': 'storage',
+    'Sound Card': 'sound_card', 'Additional Notes': 'additional_notes'
+}
+label_alternatives = '|'.join(re.escape(label) for label in requirement_labels)
+requirement_pattern = re.compile(rf'(?P<label>{label_alternatives}):\s*(?P<value>.*?)\s*(?=(?:{label_alternatives}):|$)',
+                                 re.DOTALL)
+# A comma followed by exactly three digits separates thousands, e.g. '1,024 MB',
+# any other comma is a decimal separator, e.g. '1,5 GB'
+size_pattern = re.compile(r'(?P<size>\d{1,3}(?:,\d{3})+(?!\d)(?:\.\d+)?|\d+(?:[.,]\d+)?)\s*(?P<unit>[KMGT])B',
+                          re.IGNORECASE)
+thousands_separator = re.compile(r',(?=\d{3}(?!\d))')
+size_units_mb = {'K': 1 / 1024, 'M': 1, 'G': 1024, 'T': 1024 ** 2}
+
+
+def size_to_mb(values):
+    """
+    Converts sizes such as '4 GB RAM', '1,024 MB RAM' or '1.5 TB available space' to integer megabytes.
+    Parameters:
+        values (pandas.Series): Memory or storage requirement strings.
+    Returns:
+        pandas.Series: Nullable integer megabytes.
+    """
+    sizes = values.str.extract(size_pattern)
+    number = sizes['size'].str.replace(thousands_separator, '', regex=True).str.replace(',', '.')
+    number = pd.to_numeric(number, errors='coerce')
+    multiplier = sizes['unit'].str.upper().map(size_units_mb)
+    return (number * multiplier).round().astype('Int64')
+
+
+def parse_requirements(df):
+    """
+    Tokenizes minimum and recommended requirements together in one pass and normalizes memory and storage
+    to megabytes and DirectX to a version number.
+    Parameters:
+        df (pandas.DataFrame): Data with 'steam_appid', 'minimum_req' and 'recommended_req' columns.
+    Returns:
+        pandas.DataFrame: One row per input row, aligned to its index, with 'steam_appid' and
+                          'min_<field>'/'rec_<field>' columns.
+    """
+    texts = pd.concat({prefix: df[col].map(lambda value: ' '.join(value) if isinstance(value, list) else value)
+                       for prefix, col in [('min', 'minimum_req'), ('rec', 'recommended_req')]})
+    tokens = texts.dropna().astype(str).str.extractall(requirement_pattern)
+    tokens['field'] = tokens['label'].map(requirement_labels)
+    tokens = tokens.droplevel('match').set_index('field', append=True)['value']
+    tokens = tokens[~tokens.index.duplicated()].unstack(['field'])
+    tokens = tokens.unstack(0)
+    tokens.columns = [f'{prefix}_{field}' for field, prefix in tokens.columns]
+
+    fields = list(dict.fromkeys(requirement_labels.values()))
+    columns = [f'{prefix}_{field}' for prefix in ['min', 'rec'] for field in fields]
+    requirements = pd.DataFrame({'steam_appid': df['steam_appid']}).join(tokens.reindex(columns=columns))
+    for prefix in ['min', 'rec']:
+        requirements[f'{prefix}_memory'] = size_to_mb(requirements[f'{prefix}_memory'].astype(object).astype(str))
+        requirements[f'{prefix}_storage'] = size_to_mb(requirements[f'{prefix}_storage'].astype(object).astype(str))
+        directx = requirements[f'{prefix}_directx'].astype(object).astype(str).str.extract(r'(\d+(?:\.\d+)?)')[0]
+        requirements[f'{prefix}_directx'] = pd.to_numeric(directx, errors='coerce').astype('Float32')
+    return requirements.rename(columns={f'{prefix}_{field}': f'{prefix}_{field}_mb'
+                                        for prefix in ['min', 'rec'] for field in ['memory', 'storage']})
+
+
+# Incremental mode: every raw row is hashed, and only new or changed apps are cleaned again.
+# Everything else is taken from the cleaned rows cached by the previous run
+def hash_rows(df, key):
+    """
+    Hashes the content of every raw row.
+    Parameters:
+        df (pandas.DataFrame): Raw scraped data.
+        key (str): Appid column, 'steam_appid' or 'appid'.
+    Returns:
+        pandas.Series: uint64 hash per appid, rows sharing an appid are combined.
+    """
+    hashes = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df[key].to_numpy())
+    return hashes.groupby(level=0).sum()
+
+
+def incremental_clean(steam_path='./data/download/steam_app_data.csv',
+                      steamspy_path='./data/download/steamspy_app_data.csv',
+                      cache_file='./data/cache/cleaning_cache.pkl'):
+    """
+    Cleans and merges only the apps whose raw Steam or SteamSpy rows changed since the previous run,
+    drops deleted apps and merges the result into the cached output. Name deduplication is redone only
+    for the names touched by changed or deleted apps; the app with the lowest appid of each normalized name is kept,
+    as in the full pipeline, see drop_duplicate_names.
+    A change of the missing-data drop plan or of the merged columns invalidates the whole cache.
+    Parameters:
+        steam_path (str, optional): Path to the raw Steam CSV, or a glob of shards, see cleaning.ingest.
+        steamspy_path (str, optional): Path to the raw SteamSpy CSV, or a glob of shards.
+        cache_file (str, optional): Pickle holding hashes and cleaned rows of the previous run.
+    Returns:
+        tuple: The deduplicated cleaned DataFrame and the number of apps cleaned in this run.
+    """
+    raw_steam = read_shards(steam_path)
+    raw_steamspy = read_shards(steamspy_path)
+    plan = plan_missing_data_drops(len(raw_steam), raw_steam.isna().sum())
+    steam_hashes = hash_rows(raw_steam, 'steam_appid')
+    hashes = steam_hashes ^ hash_rows(raw_steamspy, 'appid').reindex(steam_hashes.index, fill_value=0)
+
+    cache = pd.read_pickle(cache_file) if os.path.exists(cache_file) else None
+    if cache is None or cache['plan'] != plan or cache['columns'] != (steam_cols, steamspy_cols, merge_version):
+        cache = {'hashes': hashes.iloc[:0], 'merged': None, 'kept': pd.Index([])}
+    previous = cache['hashes']
+    common = hashes.index.intersection(previous.index)
+    changed = hashes.index.difference(previous.index).union(
+        common[hashes[common].to_numpy() != previous[common].to_numpy()])
+    stale = changed.union(previous.index.difference(hashes.index))
+
+    if len(changed):
+        steam_rows = raw_steam[raw_steam['steam_appid'].isin(changed)]
+        steamspy_rows = raw_steamspy[raw_steamspy['appid'].isin(changed)]
+        merged_new = merge_sources(clean_steam_chunk(steam_rows, *plan)[0], clean_steamspy_chunk(steamspy_rows))
+        merged_new = finish_merged(merged_new)
+    else:
+        merged_new = cache['merged'].iloc[:0]
+    merged_old = cache['merged'] if cache['merged'] is not None else merged_new.iloc[:0]
+    stale_rows = merged_old['steam_appid'].isin(stale)
+    merged = pd.concat([merged_old[~stale_rows], merged_new]).sort_values('steam_appid', kind='stable')
+
+    affected = name_keys(merged['name']).isin(name_keys(pd.concat([merged_old.loc[stale_rows, 'name'],
+                                                                    merged_new['name']])))
+    unaffected = merged[~affected & merged['steam_appid'].isin(cache['kept'])]
+    df = pd.concat([unaffected, drop_duplicate_names(merged[affected])]).sort_values('steam_appid')
+    df = compact_dtypes(df, report=False)
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    cache = {'plan': plan, 'columns': (steam_cols, steamspy_cols, merge_version), 'hashes': hashes, 'merged': merged,
+             'kept': pd.Index(df['steam_appid'])}
+    pd.to_pickle(cache, cache_file)
+    return df, len(changed)
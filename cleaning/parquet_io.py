@@ -0,0 +1,75 @@
+# Columnar output of the cleaned tables, and a loader for downstream consumers
+# Requires pyarrow, which is imported lazily so the cleaning scripts work without it
+import os
+import pandas as pd
+
+
+def to_arrow_column(series):
+    """
+    Converts a cleaned column to an Arrow array, keeping lists and dicts as native nested types.
+    Parameters:
+        series (pandas.Series): A column of a cleaned DataFrame.
+    Returns:
+        pyarrow.Array: Lists become list arrays, dicts (e.g. SteamSpy tags) become string-to-int maps,
+                       repeated strings are dictionary encoded and mixed columns fall back to strings.
+    """
+    import pyarrow as pa
+
+    categories = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else []
+    if len(categories) and isinstance(categories[0], tuple):
+        # Interned list columns, see cleaning.steam.intern_lists
+        series = series.astype(object).map(list)
+    if pd.api.types.is_object_dtype(series) and series.map(lambda value: isinstance(value, dict)).any():
+        items = [list(value.items()) if isinstance(value, dict) else [] for value in series]
+        return pa.array(items, type=pa.map_(pa.string(), pa.int64()))
+    try:
+        array = pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array(series.astype(str), from_pandas=True)
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        if len(array) and len(array.drop_null().unique()) <= len(array) // 2:
+            array = array.dictionary_encode()
+    return array
+
+
+def write_tables(tables, output_dir='data/cleaned', compression='zstd'):
+    """
+    Writes each DataFrame as its own Parquet file.
+    Parameters:
+        tables (dict): Mapping of table name to DataFrame, e.g. {'steam_data_merged_cleaned': df}.
+        output_dir (str, optional): Directory for the Parquet files (default is 'data/cleaned').
+        compression (str, optional): Parquet compression codec (default is 'zstd').
+    Returns:
+        list: Paths of the written files.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, frame in tables.items():
+        table = pa.table({str(col): to_arrow_column(frame[col]) for col in frame.columns})
+        path = os.path.join(output_dir, f'{name}.parquet')
+        pq.write_table(table, path, compression=compression, use_dictionary=True)
+        paths.append(path)
+    return paths
+
+
+def read_table(name, columns=None, input_dir='data/cleaned'):
+    """
+    Loads a cleaned table, memory-mapping the file and reading only the requested columns.
+    Parameters:
+        name (str): Table name, e.g. 'steam_data_merged_cleaned', 'packages' or 'reviews'.
+        columns (list, optional): Columns to read (default is None, i.e., all columns).
+        input_dir (str, optional): Directory holding the Parquet files (default is 'data/cleaned').
+    Returns:
+        pandas.DataFrame: The requested columns, with nullable integers, list columns as arrays and
+                          dictionary columns as categoricals.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(os.path.join(input_dir, f'{name}.parquet'), columns=columns, memory_map=True)
+    nullable_ints = {pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(),
+                     pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+    return table.to_pandas(types_mapper=nullable_ints.get)
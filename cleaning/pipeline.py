@@ -0,0 +1,157 @@
+# Lazy pipeline over the cleaning stages
+# Every stage is a node of a graph naming the stages it reads from. Requesting outputs runs only the stages
+# they depend on, e.g. pipeline.run(['review_df_steam']) never decodes a literal column
+from functools import partial
+import pandas as pd
+from cleaning.ingest import read_shards
+from cleaning.merged import drop_duplicate_names, finish_merged, merge_sources, parse_requirements
+from cleaning.steam import (build_language_vocabulary, clean_steam_apps, clean_steam_packages, compact_dtypes,
+                            extract_reviews, map_partitions, plan_missing_data_drops, prepare_steam)
+from cleaning.steamspy import clean_steamspy_chunk
+from cleaning.tags import build_tag_matrix
+
+# File names of the outputs, as written by the command-line entry point
+output_names = {
+    'df': 'steam_data_merged_cleaned',
+    'df_steam': 'steam_app_data_cleaned',
+    'df_steamspy': 'steamspy_data_cleaned',
+    'package_df_steam': 'packages',
+    'review_df_steam': 'reviews',
+    'requirements_df_steam': 'requirements',
+    'languages': 'languages',
+    'tag_matrix': 'steamspy_tags',
+}
+default_outputs = ['df', 'package_df_steam', 'review_df_steam', 'requirements_df_steam', 'languages', 'tag_matrix']
+
+
+def _language_vocabulary(steam_base):
+    return build_language_vocabulary(steam_base['supported_languages'])
+
+
+def _language_table(vocabulary):
+    return pd.DataFrame({'bit': range(len(vocabulary)), 'language': vocabulary})
+
+
+def _clean_steamspy(raw_steamspy, n_workers):
+    return compact_dtypes(map_partitions(raw_steamspy, clean_steamspy_chunk, 'appid', n_workers), report=False)
+
+
+def _merge(df_steam, df_steamspy):
+    return drop_duplicate_names(merge_sources(df_steam, df_steamspy))
+
+
+class Pipeline:
+    """
+    Lazy graph of the cleaning stages, from the raw CSV files to the cleaned tables.
+    Parameters:
+        steam_path (str, optional): Path to the raw Steam data, or a glob of compressed shards, see cleaning.ingest
+                                    (default is './data/download/steam_app_data.csv').
+        steamspy_path (str, optional): Path to the raw SteamSpy data, or a glob of compressed shards
+                                       (default is './data/download/steamspy_app_data.csv').
+        n_workers (int, optional): Worker processes of the row-local stages, and threads reading the shards
+                                   (default is 1, i.e., no pool).
+        report (cleaning.instrumentation.RunReport, optional): Report recording every stage run (default is None).
+    """
+
+    def __init__(self, steam_path='./data/download/steam_app_data.csv',
+                 steamspy_path='./data/download/steamspy_app_data.csv', n_workers=1, report=None):
+        self.n_workers = n_workers
+        self.report = report
+        self.stages = {}
+        self.results = {}
+        self.add_stage('raw_steam', partial(read_shards, steam_path, n_workers=n_workers))
+        self.add_stage('raw_steamspy', partial(read_shards, steamspy_path, n_workers=n_workers))
+        self.add_stage('steam_plan', lambda raw: plan_missing_data_drops(len(raw), raw.isna().sum()), ['raw_steam'])
+        self.add_stage('steam_base', lambda raw, plan: prepare_steam(raw, *plan), ['raw_steam', 'steam_plan'])
+        self.add_stage('language_vocabulary', _language_vocabulary, ['steam_base'])
+        self.add_stage('languages', _language_table, ['language_vocabulary'])
+        self.add_stage('review_df_steam', self.partitioned(extract_reviews), ['steam_base'])
+        self.add_stage('package_df_steam', lambda base: self.partitioned(clean_steam_packages)(base).reset_index(
+            drop=True), ['steam_base'])
+        self.add_stage('df_steam', lambda base, vocabulary: self.partitioned(
+            partial(clean_steam_apps, language_vocabulary=vocabulary))(base), ['steam_base', 'language_vocabulary'])
+        self.add_stage('df_steamspy', lambda raw: _clean_steamspy(raw, self.n_workers), ['raw_steamspy'])
+        self.add_stage('tag_matrix', lambda raw: build_tag_matrix(raw['appid'], raw['tags']), ['raw_steamspy'])
+        self.add_stage('merged', _merge, ['df_steam', 'df_steamspy'])
+        self.add_stage('df', finish_merged, ['merged'])
+        self.add_stage('requirements_df_steam', parse_requirements, ['df'])
+
+    def partitioned(self, func):
+        """
+        Wraps a row-local Steam stage to run over appid ranges in the worker processes.
+        """
+        return partial(map_partitions, func=func, key='steam_appid', n_workers=self.n_workers)
+
+    def add_stage(self, name, func, inputs=()):
+        """
+        Adds or replaces a stage, e.g. to plug in a custom step or to reuse a table cleaned elsewhere.
+        Parameters:
+            name (str): Name of the stage and of its output.
+            func (callable): Called with the outputs of the input stages, in order.
+            inputs (list, optional): Names of the stages it reads from (default is none).
+        """
+        self.stages[name] = (func, list(inputs))
+        self.results.pop(name, None)
+
+    def plan(self, outputs):
+        """
+        Lists the stages needed for the outputs, dependencies first. Stages already computed are not expanded.
+        Parameters:
+            outputs (list): Names of the requested outputs.
+        Returns:
+            list: Stage names in run order.
+        """
+        order, visiting = [], set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}', available stages: {', '.join(self.stages)}")
+            if name in visiting:
+                raise ValueError(f"Stage '{name}' depends on itself")
+            visiting.add(name)
+            if name not in self.results:
+                for dependency in self.stages[name][1]:
+                    visit(dependency)
+            order.append(name)
+
+        for output in outputs:
+            visit(output)
+        return order
+
+    def run(self, outputs=default_outputs):
+        """
+        Computes the outputs, running only the stages they need. Intermediate results are released
+        as soon as no remaining stage reads them; the requested outputs are kept for later calls.
+        Parameters:
+            outputs (list, optional): Names of the requested outputs (default is default_outputs).
+        Returns:
+            dict: Every requested output by name.
+        """
+        order = self.plan(outputs)
+        readers = {name: 0 for name in order}
+        for name in order:
+            if name not in self.results:
+                for dependency in self.stages[name][1]:
+                    readers[dependency] += 1
+        values = {}
+        for name in order:
+            if name in self.results:
+                values[name] = self.results[name]
+                continue
+            func, inputs = self.stages[name]
+            arguments = [values[dependency] for dependency in inputs]
+            values[name] = self.report.run(name, func, *arguments) if self.report else func(*arguments)
+            for dependency in inputs:
+                readers[dependency] -= 1
+                if readers[dependency] == 0 and dependency not in outputs:
+                    del values[dependency]
+        self.results.update({name: values[name] for name in outputs})
+        return {name: values[name] for name in outputs}
+
+    def get(self, name):
+        """
+        Computes a single output, e.g. pipeline.get('package_df_steam').
+        """
+        return self.run([name])[name]
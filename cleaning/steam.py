@@ -0,0 +1,756 @@
+# Stage functions of the Steam cleaning, free of side effects: importing this module reads no data
+# steam_cleaning.py runs them step by step as notebook cells, cleaning.pipeline chains them lazily
+import ast
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from cleaning.ingest import concat_frames, iter_chunks
+
+
+# Missing data is profiled in a single pass: the null matrix and the count per column are computed once,
+# and both threshold policies below are applied from the same profile
+class NullProfile:
+    """
+    Missing values of a DataFrame: the boolean null matrix and the number of missing values per column.
+    Dropping rows or columns through the profile updates it from the matrix, without scanning the data again.
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+    """
+
+    def __init__(self, df):
+        self.columns = df.columns
+        self.mask = df.isna().to_numpy()
+        self.counts = pd.Series(self.mask.sum(axis=0), index=self.columns)
+
+    @property
+    def n_rows(self):
+        return len(self.mask)
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    @property
+    def nbytes(self):
+        return self.mask.nbytes
+
+    def drop_columns(self, columns):
+        """
+        Removes columns from the profile.
+        """
+        keep = ~self.columns.isin(columns)
+        self.columns, self.mask, self.counts = self.columns[keep], self.mask[:, keep], self.counts[keep]
+
+    def drop_rows(self, keep):
+        """
+        Removes rows from the profile.
+        Parameters:
+            keep (numpy.ndarray): Boolean mask of the rows kept.
+        """
+        self.mask = self.mask[keep]
+        self.counts = pd.Series(self.mask.sum(axis=0), index=self.columns)
+
+    def complete_rows(self, columns):
+        """
+        Boolean mask of the rows with no missing value in any of the columns.
+        """
+        return ~self.mask[:, self.columns.get_indexer(columns)].any(axis=1)
+
+
+def drop_missing_data(target_df, row_threshold=0.01, col_threshold=0.5, profile=None):
+    """
+    Applies both missing-data policies in one step, see plan_missing_data_drops: rows are dropped where
+    a column with less than row_threshold missing data is empty, columns are dropped where more than
+    col_threshold of the data is missing. The rows are dropped with a single combined mask and the data
+    is copied once.
+    Parameters:
+        target_df (pandas.DataFrame): The input DataFrame.
+        row_threshold (float, optional): Threshold for dropping rows (default is 0.01, i.e., 1%).
+        col_threshold (float, optional): Threshold for dropping columns (default is 0.5, i.e., 50%).
+        profile (NullProfile, optional): Profile of target_df, updated in place (default is a new profile).
+    Returns:
+        tuple: The DataFrame with rows and columns dropped, and a pandas.DataFrame reporting every column
+               acted on: its missing values, the action and the reason.
+    """
+    profile = NullProfile(target_df) if profile is None else profile
+    n_rows, counts = profile.n_rows, profile.counts
+    row_na_cols, drop_cols = plan_missing_data_drops(n_rows, counts, row_threshold, col_threshold)
+    keep = profile.complete_rows(row_na_cols)
+    report = pd.DataFrame({
+        'column': row_na_cols + drop_cols,
+        'missing': counts[row_na_cols + drop_cols].to_numpy(),
+        'action': ['drop rows'] * len(row_na_cols) + ['drop column'] * len(drop_cols),
+        'reason': [f'less than {row_threshold:.0%} missing'] * len(row_na_cols)
+                  + [f'more than {col_threshold:.0%} missing'] * len(drop_cols),
+    })
+    report.insert(2, 'missing_share', report['missing'] / max(n_rows, 1))
+    report['rows_dropped'] = [int(profile.mask[:, profile.columns.get_loc(col)].sum()) for col in row_na_cols] \
+        + [0] * len(drop_cols)
+
+    profile.drop_columns(drop_cols)
+    profile.drop_rows(keep)
+    return target_df.loc[keep, profile.columns], report
+
+
+def drop_na_rows_less_than_threshold(target_df, threshold=0.01, profile=None):
+    """
+    Drop rows from the DataFrame where a column with less than the specified threshold of missing data is empty.
+
+    Parameters:
+        target_df (pandas.DataFrame): The input DataFrame.
+        threshold (float, optional): The threshold for the percentage of missing data (default is 0.01, i.e., 1%).
+        profile (NullProfile, optional): Profile of target_df, updated in place (default is a new profile).
+
+    Returns:
+        pandas.DataFrame: The DataFrame with rows dropped.
+    """
+    return drop_missing_data(target_df, row_threshold=threshold, col_threshold=1, profile=profile)[0]
+
+
+def drop_na_columns_more_than_threshold(target_df, threshold=0.5, profile=None):
+    """
+    Drop columns from the DataFrame where the percentage of missing data is more than the specified threshold.
+
+    Parameters:
+        target_df (pandas.DataFrame): The input DataFrame.
+        threshold (float, optional): The threshold for the percentage of missing data (default is 0.5, i.e., 50%).
+        profile (NullProfile, optional): Profile of target_df, updated in place (default is a new profile).
+
+    Returns:
+        pandas.DataFrame: The DataFrame with columns dropped.
+    """
+    return drop_missing_data(target_df, row_threshold=0, col_threshold=threshold, profile=profile)[0]
+
+
+# data is full of html tags, which should be cleaned
+html_tag_pattern = re.compile(r'<[^>]+>')
+# '&amp;' goes last so that escaped entities such as '&amp;lt;' are decoded only once
+html_entities = {
+    '&lt;': '<', '&gt;': '>', '&quot;': '"', '&#39;': "'", '&apos;': "'", '&nbsp;': ' ',
+    '&reg;': '\u00ae', '&trade;': '\u2122', '&copy;': '\u00a9', '&amp;': '&'
+}
+
+
+def remove_html(string):
+    """
+    Removes HTML tags and backslashes from the input string and decodes common HTML entities.
+    Parameters:
+        string (str): The input string to be cleaned from HTML tags and backslashes.
+    Returns:
+        str: The cleaned string with HTML tags and backslashes removed.
+    """
+    cleaned = html_tag_pattern.sub('', string)
+    cleaned = cleaned.replace('\\', '')
+    for entity, char in html_entities.items():
+        cleaned = cleaned.replace(entity, char)
+    return cleaned
+
+
+def remove_html_series(series):
+    """
+    Vectorized remove_html over a whole column of strings.
+    Parameters:
+        series (pandas.Series): Column of strings to be cleaned.
+    Returns:
+        pandas.Series: The cleaned column.
+    """
+    cleaned = series.str.replace(html_tag_pattern, '', regex=True)
+    cleaned = cleaned.str.replace('\\', '', regex=False)
+    for entity, char in html_entities.items():
+        cleaned = cleaned.str.replace(entity, char, regex=False)
+    return cleaned
+
+
+def remove_html_columns(df, columns, n_jobs=1, min_rows_per_job=50_000):
+    """
+    Cleans several columns from HTML in one batched pass. Each column is cleaned once, even if listed twice.
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        columns (list): Columns to be cleaned.
+        n_jobs (int, optional): Number of worker processes for large columns (default is 1, no pool).
+        min_rows_per_job (int, optional): Smallest slice of a column worth sending to a worker (default is 50 000).
+    Returns:
+        pandas.DataFrame: A new DataFrame with cleaned columns, the input is left unchanged.
+    """
+    columns = list(dict.fromkeys(columns))
+    n_parts = min(n_jobs, len(df) // min_rows_per_job)
+    if n_parts < 2:
+        return df.assign(**{col: remove_html_series(df[col]) for col in columns})
+    bounds = np.linspace(0, len(df), n_parts + 1, dtype=int)
+    with ProcessPoolExecutor(max_workers=n_parts) as pool:
+        futures = {col: [pool.submit(remove_html_series, df[col].iloc[start:end])
+                         for start, end in zip(bounds[:-1], bounds[1:])]
+                   for col in columns}
+        return df.assign(**{col: pd.concat([part.result() for part in parts]) for col, parts in futures.items()})
+
+
+# Price, platforms, release date, achievements, packages and requirements are dictionaries in string format
+# Every distinct payload is parsed only once, and the needed fields go straight into typed columns
+def parse_literal(string):
+    """
+    Safely parses a Python literal stored as a string. Callers parse distinct payloads only, see decode_literal_column.
+    Parameters:
+        string (str): The stringified dict or list.
+    Returns:
+        The parsed object, or None if the value is missing or not a valid literal.
+    """
+    if not isinstance(string, str):
+        return None
+    try:
+        return ast.literal_eval(string)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def decode_literal_column(series, fields):
+    """
+    Parses each distinct value of a stringified literal column once and extracts the requested fields.
+    Parameters:
+        series (pandas.Series): Column holding stringified dicts or lists.
+        fields (dict): Mapping of output column name to a function taking the parsed value.
+    Returns:
+        pandas.DataFrame: One column per field, aligned to the index of the input series.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    parsed = [parse_literal(value) for value in uniques]
+    decoded = {}
+    for name, getter in fields.items():
+        values = np.empty(len(parsed), dtype=object)
+        values[:] = [getter(value) for value in parsed]
+        decoded[name] = values[codes]
+    return pd.DataFrame(decoded, index=series.index)
+
+
+def _get(parsed, key, default='unknown'):
+    return parsed.get(key, default) if isinstance(parsed, dict) else default
+
+
+def _requirement(parsed, key):
+    return [remove_html(parsed[key])] if isinstance(parsed, dict) and key in parsed else []
+
+
+literal_fields = {
+    'price_overview': {
+        'currency': lambda d: _get(d, 'currency'),
+        'initial_price': lambda d: _get(d, 'initial'),
+    },
+    'platforms': {
+        'windows': lambda d: bool(_get(d, 'windows', False)),
+        'linux': lambda d: bool(_get(d, 'linux', False)),
+        'mac': lambda d: bool(_get(d, 'mac', False)),
+    },
+    'release_date': {
+        'coming_soon': lambda d: bool(_get(d, 'coming_soon', False)),
+        'date_str': lambda d: str(_get(d, 'date', '')).lower(),
+    },
+    'achievements': {
+        'number_of_achievements': lambda d: _get(d, 'total'),
+    },
+    'pc_requirements': {
+        'minimum_req': lambda d: _requirement(d, 'minimum'),
+        'recommended_req': lambda d: _requirement(d, 'recommended'),
+    },
+    'package_groups': {
+        'package_groups': lambda d: d if isinstance(d, list) else [],
+    },
+}
+bool_fields = ['windows', 'linux', 'mac', 'coming_soon']
+
+
+def decode_literal_columns(df_steam, columns=literal_fields):
+    """
+    Replaces the stringified dict/list columns with the typed columns extracted from them.
+    Parameters:
+        df_steam (pandas.DataFrame): DataFrame holding the raw stringified columns.
+        columns (dict, optional): Mapping of raw column to its output fields (default is literal_fields).
+    Returns:
+        pandas.DataFrame: The DataFrame with decoded columns in place of the raw ones.
+    """
+    decoded = [decode_literal_column(df_steam[col], fields) for col, fields in columns.items()]
+    df_steam = pd.concat([df_steam.drop(columns=list(columns)), *decoded], axis=1)
+    present = [col for col in bool_fields if col in df_steam.columns]
+    df_steam[present] = df_steam[present].astype(bool)
+    return df_steam
+
+
+# creating a list of developers and publishers for easier further access
+def string_to_list_cleaning(df_steam, target_col):
+    return df_steam.assign(**{target_col: df_steam[target_col].apply(
+        lambda x: [element.strip("[ '']") for element in x.split(",")])})
+
+
+# Processing languages column into text and audio support bitmasks over a global language vocabulary
+# '*' connected to language is an indicator of audio support of this specific language
+# Steam's own languages always come first, so their bits stay the same between runs and chunks
+steam_languages = [
+    'English', 'French', 'Italian', 'German', 'Spanish - Spain', 'Japanese', 'Korean', 'Polish',
+    'Portuguese - Brazil', 'Russian', 'Simplified Chinese', 'Traditional Chinese', 'Arabic', 'Bulgarian',
+    'Czech', 'Danish', 'Dutch', 'Finnish', 'Greek', 'Hungarian', 'Indonesian', 'Norwegian',
+    'Portuguese - Portugal', 'Romanian', 'Spanish - Latin America', 'Swedish', 'Thai', 'Turkish',
+    'Ukrainian', 'Vietnamese'
+]
+language_mask_width = 64
+audio_support_suffix = re.compile(r'\*?\s*languages with full audio support\s*$')
+
+
+def split_languages(language_strings):
+    """
+    Splits the cleaned 'supported_languages' strings into one row per language.
+    Parameters:
+        language_strings (pandas.Series): Comma separated languages, HTML already removed.
+    Returns:
+        tuple: Row position of every language, language names and a boolean array of full audio support.
+    """
+    language_lists = language_strings.str.replace(audio_support_suffix, '', regex=True).str.split(',')
+    positions = np.repeat(np.arange(len(language_lists)), language_lists.str.len().fillna(0).astype(int))
+    languages = language_lists.explode().dropna().str.strip()
+    audio = languages.str.endswith('*').to_numpy(dtype=bool)
+    names = languages.str.rstrip('*').str.strip().to_numpy(dtype=object)
+    valid = (names != '') & (names != 'nan')
+    return positions[valid], names[valid], audio[valid]
+
+
+def build_language_vocabulary(language_strings):
+    """
+    Builds the global language vocabulary in one pass: Steam's languages first, then the other names
+    found in the data by decreasing frequency, up to language_mask_width languages.
+    Parameters:
+        language_strings (pandas.Series): The cleaned 'supported_languages' column.
+    Returns:
+        pandas.Index: Languages, the position of a language is its bit in the masks.
+    """
+    _, names, _ = split_languages(language_strings)
+    counts = pd.Series(names, dtype=object).value_counts()
+    extra = [name for name in counts.index if name not in steam_languages]
+    return pd.Index(steam_languages + extra[:language_mask_width - len(steam_languages)])
+
+
+def encode_languages(language_strings, vocabulary=pd.Index(steam_languages)):
+    """
+    Encodes every app's supported languages as integer bitmasks. Languages outside the vocabulary are ignored.
+    Parameters:
+        language_strings (pandas.Series): The cleaned 'supported_languages' column.
+        vocabulary (pandas.Index, optional): Language vocabulary (default is Steam's own languages).
+    Returns:
+        pandas.DataFrame: 'text_languages' (every supported language) and 'audio_languages' (full audio support)
+                          uint64 bitmasks, aligned to the input index.
+    """
+    positions, names, audio = split_languages(language_strings)
+    bits = vocabulary.get_indexer(names)
+    known = bits >= 0
+    positions, audio = positions[known], audio[known]
+    bits = np.left_shift(np.uint64(1), bits[known].astype(np.uint64))
+    text_languages = np.zeros(len(language_strings), dtype=np.uint64)
+    audio_languages = np.zeros(len(language_strings), dtype=np.uint64)
+    np.bitwise_or.at(text_languages, positions, bits)
+    np.bitwise_or.at(audio_languages, positions[audio], bits[audio])
+    return pd.DataFrame({'text_languages': text_languages, 'audio_languages': audio_languages},
+                        index=language_strings.index)
+
+
+def apps_supporting(df, language, vocabulary=pd.Index(steam_languages), audio=False):
+    """
+    Vectorized language filter, e.g. apps_supporting(df_steam, 'German', audio=True).
+    Parameters:
+        df (pandas.DataFrame): DataFrame with the language bitmasks.
+        language (str): Language name from the vocabulary.
+        vocabulary (pandas.Index, optional): Vocabulary the masks were built with (default is Steam's own languages).
+        audio (bool, optional): Require full audio support instead of any support (default is False).
+    Returns:
+        pandas.Series: Boolean mask of the apps supporting the language.
+    """
+    bit = np.uint64(1) << np.uint64(vocabulary.get_loc(language))
+    masks = df['audio_languages' if audio else 'text_languages'].to_numpy(dtype=np.uint64)
+    return pd.Series((masks & bit) != 0, index=df.index)
+
+
+def decode_languages(masks, vocabulary=pd.Index(steam_languages)):
+    """
+    Turns language bitmasks back into lists of language names.
+    Parameters:
+        masks (pandas.Series): 'text_languages' or 'audio_languages' bitmasks.
+        vocabulary (pandas.Index, optional): Vocabulary the masks were built with (default is Steam's own languages).
+    Returns:
+        pandas.Series: Lists of language names.
+    """
+    bits = np.uint64(1) << np.arange(len(vocabulary), dtype=np.uint64)
+    flags = (masks.to_numpy(dtype=np.uint64)[:, None] & bits) != 0
+    names = vocabulary.to_numpy(dtype=object)
+    return pd.Series([list(names[row]) for row in flags], index=masks.index)
+
+
+# Decided to create a separate dataframe for distinct packages with 'appid' as foreign key
+def extract_package_info(df_steam):
+    """
+    Builds the packages DataFrame from the parsed 'package_groups' column in one batched pass.
+    Only the first package group of each app is used; apps without package groups get no rows.
+    Parameters:
+        df_steam (pandas.DataFrame): DataFrame with 'steam_appid', 'name' and parsed 'package_groups' columns.
+    Returns:
+        pandas.DataFrame: One row per package with 'appid' as foreign key.
+    """
+    groups = df_steam['package_groups']
+    subs = groups[groups.str.len() > 0].str[0].str.get('subs').explode().dropna()
+    packages = pd.json_normalize(subs.tolist())
+    columns = ['packageid', 'option_text', 'is_free_license', 'price_in_cents_with_discount']
+    packages = packages.reindex(columns=columns).set_axis(subs.index).dropna()
+    apps = df_steam.loc[packages.index, ['steam_appid', 'name']]
+    package_df_steam = pd.DataFrame({
+        'package_id': packages['packageid'].astype('int64'),
+        'appid': apps['steam_appid'].astype('int64'),
+        'name': apps['name'],
+        'package_name': clean_package_names(packages['option_text'].astype(str)),
+        'is_free': packages['is_free_license'].astype(bool),
+        'price': (packages['price_in_cents_with_discount'] / 100).astype('float32')  # Convert cents to dollars
+    })
+    return package_df_steam.reset_index(drop=True)
+
+
+# Some cleaning of newly created columns
+def clean_package_names(package_names):
+    """
+    Removes HTML tags, backslashes and the trailing "- $price" part from package names.
+    Parameters:
+        package_names (pandas.Series): Raw package option texts.
+    Returns:
+        pandas.Series: The cleaned package names.
+    """
+    package_names = remove_html_series(package_names)
+    return package_names.str.replace(r'(?s)^\s*(.*?)\s*-[^-]*$', r'\1', regex=True)
+
+
+# Most columns are still 'object': numbers mixed with 'unknown'/'free' sentinels, repeated strings
+# and per-row lists. Compacting them into nullable, categorical and interned columns
+sentinel_columns = {'initial_price': 'price_status', 'number_of_achievements': 'achievements_status'}
+category_columns = ['currency', 'genre', 'date_str']
+list_columns = ['developers', 'publishers']
+
+
+def downcast_nullable(values):
+    """
+    Converts a numeric column to the smallest nullable integer type holding all its values.
+    Parameters:
+        values (pandas.Series): Numeric column, possibly with missing values.
+    Returns:
+        pandas.Series: The column as Int8, Int16, Int32 or Int64.
+    """
+    low, high = values.min(), values.max()
+    for dtype in ['Int8', 'Int16', 'Int32']:
+        info = np.iinfo(dtype.lower())
+        if pd.isna(low) or (info.min <= low and high <= info.max):
+            return values.astype(dtype)
+    return values.astype('Int64')
+
+
+def split_sentinels(series):
+    """
+    Splits a column mixing numbers with 'unknown'/'free' sentinels into numbers and a status.
+    Parameters:
+        series (pandas.Series): The mixed column.
+    Returns:
+        tuple: The nullable integer column and a status categorical ('value', 'unknown' or 'free').
+    """
+    values = pd.to_numeric(series, errors='coerce')
+    status = np.where(values.notna(), 'value', np.where(series == 'free', 'free', 'unknown'))
+    status = pd.Series(status, index=series.index, dtype=pd.CategoricalDtype(['value', 'unknown', 'free']))
+    return downcast_nullable(values), status
+
+
+def intern_lists(series):
+    """
+    Interns a column of lists: every distinct list is stored once and each row holds an integer code.
+    Parameters:
+        series (pandas.Series): Column of lists, e.g. 'developers'.
+    Returns:
+        pandas.Series: Categorical column whose categories are the distinct lists as tuples.
+    """
+    return series.map(tuple).astype('category')
+
+
+def compact_dtypes(df, report=True):
+    """
+    Converts sentinel columns to nullable integers plus status categoricals, repeated strings to categoricals
+    and list columns to interned categoricals. Columns missing from the DataFrame are skipped.
+    Parameters:
+        df (pandas.DataFrame): The cleaned DataFrame.
+        report (bool, optional): Print the memory footprint before and after (default is True).
+    Returns:
+        pandas.DataFrame: A new compacted DataFrame, the input is left unchanged.
+    """
+    memory_before = df.memory_usage(deep=True).sum()
+    compacted = {}
+    for col, status_col in sentinel_columns.items():
+        if col in df.columns and status_col not in df.columns:
+            compacted[col], compacted[status_col] = split_sentinels(df[col])
+    for col in category_columns:
+        if col in df.columns:
+            compacted[col] = df[col].astype('category')
+    for col in list_columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            compacted[col] = intern_lists(df[col])
+    df = df.assign(**compacted)
+    if report:
+        memory_after = df.memory_usage(deep=True).sum()
+        print(f"Memory usage: {memory_before / 2 ** 20:.1f} MB -> {memory_after / 2 ** 20:.1f} MB")
+    return df
+
+
+# Streaming mode: the same cleaning applied chunk by chunk, so peak memory
+# depends on the chunk size and not on the size of the scraped dump
+def profile_missing_data(path, chunksize=50_000, n_workers=1):
+    """
+    Cheap first pass over the raw CSV counting missing values per column.
+
+    Parameters:
+        path (str): Path to the raw scraped CSV, or a glob of compressed shards, see cleaning.ingest.
+        chunksize (int, optional): Number of rows read at once from a single CSV (default is 50 000).
+        n_workers (int, optional): Number of processes reading the shards (default is 1).
+
+    Returns:
+        tuple: Total number of rows and a pandas.Series with the number of missing values per column.
+    """
+    n_rows = 0
+    na_counts = None
+    for chunk in iter_chunks(path, chunksize, n_workers=n_workers):
+        n_rows += len(chunk)
+        chunk_counts = chunk.isna().sum()
+        na_counts = chunk_counts if na_counts is None else na_counts.add(chunk_counts, fill_value=0)
+    return n_rows, na_counts.astype(int)
+
+
+def plan_missing_data_drops(n_rows, na_counts, row_threshold=0.01, col_threshold=0.5):
+    """
+    Decides which dataset-wide drops to apply, using the counts from profile_missing_data.
+    Rows are dropped where a column with less than row_threshold missing data is empty,
+    columns are dropped where more than col_threshold of the data is missing.
+
+    Parameters:
+        n_rows (int): Total number of rows in the raw CSV.
+        na_counts (pandas.Series): Number of missing values per column.
+        row_threshold (float, optional): Threshold for dropping rows (default is 0.01, i.e., 1%).
+        col_threshold (float, optional): Threshold for dropping columns (default is 0.5, i.e., 50%).
+
+    Returns:
+        tuple: A list of columns whose missing rows are dropped and a list of columns to drop.
+    """
+    row_na_cols = [col for col, count in na_counts.items() if 0 < count < round(n_rows * row_threshold)]
+    drop_cols = [col for col, count in na_counts.items() if count > n_rows * col_threshold]
+    return row_na_cols, drop_cols
+
+
+review_cols = ['detailed_description', 'about_the_game', 'short_description']
+app_literal_fields = {col: fields for col, fields in literal_fields.items() if col != 'package_groups'}
+
+
+def prepare_steam(chunk, row_na_cols, drop_cols):
+    """
+    Applies the missing-data plan, marks the remaining missing values as 'unknown', drops unused columns and
+    cleans 'supported_languages' from HTML, once for both the language vocabulary and the bitmasks.
+    Parameters:
+        chunk (pandas.DataFrame): Raw scraped Steam data, or a chunk of it.
+        row_na_cols (list): Columns whose missing values drop the whole row.
+        drop_cols (list): Columns dropped for having too much missing data.
+    Returns:
+        pandas.DataFrame: The rows and columns every later stage starts from.
+    """
+    chunk = chunk.dropna(subset=row_na_cols).drop(columns=drop_cols)
+    for column in ['website', 'price_overview', 'packages', 'categories', 'movies', 'achievements']:
+        chunk[column] = chunk[column].replace({pd.NA: 'unknown'})
+    chunk['supported_languages'] = remove_html_series(chunk['supported_languages'].astype(str))
+    return chunk.drop(columns=['screenshots', 'movies', 'support_info', 'background', 'content_descriptors',
+                               'linux_requirements', 'mac_requirements'])
+
+
+def extract_reviews(chunk):
+    """
+    Builds the reviews DataFrame: the description columns cleaned from HTML, with 'steam_appid' as foreign key.
+    Parameters:
+        chunk (pandas.DataFrame): Output of prepare_steam.
+    Returns:
+        pandas.DataFrame: 'steam_appid' and the description columns.
+    """
+    review_chunk = chunk[['steam_appid'] + review_cols].astype({col: str for col in review_cols})
+    return remove_html_columns(review_chunk, review_cols)
+
+
+def mark_free_prices(chunk):
+    """
+    Sets the price and currency of free games without price overview to 'free', leaving 'unknown' for
+    the prices that are truly missing.
+    Parameters:
+        chunk (pandas.DataFrame): DataFrame with 'is_free', 'initial_price' and 'currency' columns.
+    Returns:
+        pandas.DataFrame: A new DataFrame with the free prices marked, the input is left unchanged.
+    """
+    condition = (chunk['is_free'] == True) & (chunk['initial_price'] == 'unknown') & (chunk['currency'] == 'unknown')
+    return chunk.assign(initial_price=chunk['initial_price'].mask(condition, 'free'),
+                        currency=chunk['currency'].mask(condition, 'free'))
+
+
+def decode_steam(chunk, language_vocabulary=pd.Index(steam_languages), columns=literal_fields):
+    """
+    Turns the prepared Steam columns into typed ones: literal columns, free prices, developer and publisher lists
+    and language bitmasks. The description columns are dropped, see extract_reviews.
+    Parameters:
+        chunk (pandas.DataFrame): Output of prepare_steam.
+        language_vocabulary (pandas.Index, optional): Languages of the bitmasks (default is Steam's own languages,
+                                                     so that the bits are the same in every chunk).
+        columns (dict, optional): Literal columns to decode (default is literal_fields).
+    Returns:
+        pandas.DataFrame: The decoded DataFrame.
+    """
+    chunk = chunk.drop(columns=review_cols)
+    chunk = mark_free_prices(decode_literal_columns(chunk, columns))
+    for col in ['developers', 'publishers']:
+        chunk[col] = chunk[col].astype(str)
+        chunk = string_to_list_cleaning(chunk, col)
+    chunk = chunk.join(encode_languages(chunk['supported_languages'], language_vocabulary))
+    return chunk.drop(columns=['supported_languages'])
+
+
+def clean_steam_apps(chunk, language_vocabulary=pd.Index(steam_languages)):
+    """
+    Builds the cleaned app DataFrame from prepared data without decoding the package groups.
+    Parameters:
+        chunk (pandas.DataFrame): Output of prepare_steam.
+        language_vocabulary (pandas.Index, optional): Languages of the bitmasks (default is Steam's own languages).
+    Returns:
+        pandas.DataFrame: The cleaned and compacted apps.
+    """
+    chunk = decode_steam(chunk.drop(columns='package_groups'), language_vocabulary, app_literal_fields)
+    return compact_dtypes(chunk, report=False)
+
+
+def clean_steam_packages(chunk):
+    """
+    Builds the packages DataFrame from prepared data, decoding only the package groups.
+    Parameters:
+        chunk (pandas.DataFrame): Output of prepare_steam.
+    Returns:
+        pandas.DataFrame: One row per package, see extract_package_info.
+    """
+    columns = {'package_groups': literal_fields['package_groups']}
+    return extract_package_info(decode_literal_columns(chunk[['steam_appid', 'name', 'package_groups']], columns))
+
+
+def clean_steam_chunk(chunk, row_na_cols, drop_cols, language_vocabulary=pd.Index(steam_languages)):
+    """
+    Runs every row-local cleaning stage on one chunk of the raw Steam data.
+
+    Parameters:
+        chunk (pandas.DataFrame): A chunk of the raw scraped Steam data.
+        row_na_cols (list): Columns whose missing values drop the whole row.
+        drop_cols (list): Columns dropped for having too much missing data.
+        language_vocabulary (pandas.Index, optional): Languages of the bitmasks (default is Steam's own languages,
+                                                     so that the bits are the same in every chunk).
+
+    Returns:
+        tuple: The cleaned chunk, its reviews DataFrame and its packages DataFrame.
+    """
+    chunk = prepare_steam(chunk, row_na_cols, drop_cols)
+    review_chunk = extract_reviews(chunk)
+    chunk = decode_steam(chunk, language_vocabulary)
+    package_chunk = extract_package_info(chunk)
+    chunk = compact_dtypes(chunk.drop(columns='package_groups'), report=False)
+    return chunk, review_chunk, package_chunk
+
+
+def stream_clean_steam(path, output_dir, chunksize=50_000, n_workers=1):
+    """
+    Cleans the raw Steam CSV chunk by chunk and appends the results to CSV files in output_dir,
+    so the whole dump is never held in memory. The missing-data thresholds are computed over
+    the whole file by a first counting pass; the package table needs no extra pass as every
+    package belongs to a single app. Sharded dumps are cleaned shard by shard, each shard in
+    a worker process when there are several workers.
+
+    Parameters:
+        path (str): Path to the raw scraped Steam CSV, or a glob of compressed shards, see cleaning.ingest.
+        output_dir (str): Directory for steam_app_data_cleaned.csv, steam_reviews.csv and steam_packages.csv.
+        chunksize (int, optional): Number of rows cleaned at once from a single CSV (default is 50 000).
+        n_workers (int, optional): Number of processes cleaning the shards (default is 1).
+
+    Returns:
+        int: Number of cleaned rows written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_rows, na_counts = profile_missing_data(path, chunksize, n_workers)
+    row_na_cols, drop_cols = plan_missing_data_drops(n_rows, na_counts)
+    outputs = ['steam_app_data_cleaned.csv', 'steam_reviews.csv', 'steam_packages.csv']
+    clean = partial(clean_steam_chunk, row_na_cols=row_na_cols, drop_cols=drop_cols)
+    n_written = 0
+    for i, cleaned in enumerate(iter_chunks(path, chunksize, clean, n_workers)):
+        for frame, name in zip(cleaned, outputs):
+            frame.to_csv(os.path.join(output_dir, name), mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        n_written += len(cleaned[0])
+    return n_written
+
+
+# Parallel mode: every app is cleaned independently, so the frame is split by appid range
+# and the row-local stages run in a process pool
+def split_by_key_range(df, key, n_partitions):
+    """
+    Splits the DataFrame into contiguous ranges of the key column, in ascending key order.
+
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        key (str): Column to partition on, e.g. 'steam_appid' or 'appid'.
+        n_partitions (int): Number of partitions.
+
+    Returns:
+        list: Non-empty DataFrame partitions.
+    """
+    order = np.argsort(df[key].to_numpy(), kind='stable')
+    bounds = np.linspace(0, len(df), n_partitions + 1, dtype=int)
+    return [df.iloc[order[start:end]] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def map_partitions(df, func, key, n_workers=1, partitions_per_worker=4):
+    """
+    Applies a row-local stage to key ranges of the DataFrame in a process pool and reassembles the
+    results in key order, merging the categories of the partitions, see cleaning.ingest.concat_frames.
+    With a single worker the stage is applied to the whole DataFrame, sorted by key as well, so the row
+    order of the output does not depend on the number of workers.
+
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        func (callable): Module-level function taking and returning a DataFrame, or a tuple of DataFrames.
+        key (str): Column to partition on, e.g. 'steam_appid' or 'appid'.
+        n_workers (int, optional): Number of worker processes (default is 1).
+        partitions_per_worker (int, optional): Partitions per worker, to even out the load (default is 4).
+
+    Returns:
+        pandas.DataFrame or tuple: The concatenated results of func.
+    """
+    if n_workers < 2:
+        if not df[key].is_monotonic_increasing:
+            df = df.iloc[np.argsort(df[key].to_numpy(), kind='stable')]
+        return func(df)
+    parts = split_by_key_range(df, key, n_workers * partitions_per_worker)
+    if len(parts) < 2:
+        return func(parts[0] if parts else df)
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        results = list(pool.map(func, parts))
+    if isinstance(results[0], tuple):
+        return tuple(concat_frames(frames) for frames in zip(*results))
+    return concat_frames(results)
+
+
+def parallel_clean_steam(raw_df_steam, n_workers=os.cpu_count()):
+    """
+    Cleans freshly loaded Steam data with the row-local stages spread over a process pool.
+    The missing-data thresholds are computed over the whole DataFrame before it is split.
+
+    Parameters:
+        raw_df_steam (pandas.DataFrame): The raw scraped Steam data.
+        n_workers (int, optional): Number of worker processes (default is the number of CPUs).
+
+    Returns:
+        tuple: The cleaned DataFrame, the reviews DataFrame and the packages DataFrame.
+    """
+    row_na_cols, drop_cols = plan_missing_data_drops(len(raw_df_steam), raw_df_steam.isna().sum())
+    clean = partial(clean_steam_chunk, row_na_cols=row_na_cols, drop_cols=drop_cols)
+    df_steam, review_df_steam, package_df_steam = map_partitions(raw_df_steam, clean, 'steam_appid', n_workers)
+    return df_steam, review_df_steam, package_df_steam.reset_index(drop=True)
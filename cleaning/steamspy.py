@@ -0,0 +1,56 @@
+# Stage functions of the SteamSpy cleaning, free of side effects
+# The tags are encoded separately from the raw payloads, see cleaning.tags
+import pandas as pd
+from cleaning.steam import downcast_nullable
+
+
+# Vote, concurrent user and playtime counts, stored as the smallest nullable integer type holding them
+steamspy_int_cols = ['positive', 'negative', 'ccu', 'average_forever', 'average_2weeks', 'median_forever',
+                     'median_2weeks']
+# Owners are given as a range, e.g. '20,000 .. 50,000'
+owners_pattern = r'^\s*([\d,]+)\s*\.\.\s*([\d,]+)\s*$'
+
+
+def parse_owner_ranges(owners):
+    """
+    Extracts the bounds of the owners ranges with one regex over the distinct ranges, of which there are few.
+    Parameters:
+        owners (pandas.Series): Owners ranges, e.g. '20,000 .. 50,000'.
+    Returns:
+        pandas.DataFrame: 'owners_low', 'owners_high' and their midpoint 'approx_owners' as nullable integers,
+                          missing where the range is missing or malformed.
+    """
+    codes, ranges = pd.factorize(owners)
+    bounds = pd.Series(ranges, dtype=object).astype(str).str.extract(owners_pattern)
+    bounds = bounds.apply(lambda bound: pd.to_numeric(bound.str.replace(',', '', regex=False)))
+    bounds.columns = ['owners_low', 'owners_high']
+    bounds['approx_owners'] = (bounds['owners_low'] + bounds['owners_high']) // 2
+    bounds = bounds.reindex(codes).set_axis(owners.index)
+    return bounds.apply(downcast_nullable)
+
+
+def normalize_steamspy_numbers(df_steamspy):
+    """
+    Adds the owners bounds, see parse_owner_ranges, and downcasts the count columns to nullable integers,
+    so that a missing value leaves the rest of the app intact.
+    Parameters:
+        df_steamspy (pandas.DataFrame): Raw SteamSpy data, or a partition of it.
+    Returns:
+        pandas.DataFrame: The data with numeric columns normalized.
+    """
+    df_steamspy = df_steamspy.join(parse_owner_ranges(df_steamspy['owners']))
+    for col in steamspy_int_cols:
+        df_steamspy[col] = downcast_nullable(pd.to_numeric(df_steamspy[col], errors='coerce'))
+    return df_steamspy
+
+
+def clean_steamspy_chunk(df_steamspy):
+    """
+    Runs the row-local SteamSpy stages: owners bounds and nullable integer counts. The tags payload is dropped,
+    see cleaning.tags.build_tag_matrix.
+    Parameters:
+        df_steamspy (pandas.DataFrame): Raw SteamSpy data, or a partition of it.
+    Returns:
+        pandas.DataFrame: The cleaned SteamSpy data.
+    """
+    return normalize_steamspy_numbers(df_steamspy.drop(columns='tags'))
@@ -0,0 +1,201 @@
+# SteamSpy tags as a sparse app-by-tag matrix of votes
+# The tags payload is a stringified dict, e.g. {'Action': 5426, "Shoot 'Em Up": 12}, parsed once per app into
+# a CSR matrix (compressed sparse rows) over a global tag vocabulary. Rows are sorted by appid
+import ast
+import itertools
+import re
+import numpy as np
+import pandas as pd
+
+# One "'tag': votes" pair of a payload. Tags holding an apostrophe are double quoted, e.g. "Shoot 'Em Up"
+tag_pair_pattern = re.compile(r"""('[^'\\]*(?:\\.[^'\\]*)*'|"[^"\\]*(?:\\.[^"\\]*)*")\s*:\s*(\d+)""")
+
+
+def unquote_tag(quoted):
+    """
+    Strips the quotes of a tag matched by tag_pair_pattern, decoding escapes if there are any.
+    """
+    return ast.literal_eval(quoted) if '\\' in quoted else quoted[1:-1]
+
+
+def parse_tags(payload):
+    """
+    Parses a SteamSpy tags payload.
+    Parameters:
+        payload (str): Stringified dict of tag votes, '[]' for apps without tags.
+    Returns:
+        dict: Votes of every tag, empty if the payload is missing or holds no tags.
+    """
+    if not isinstance(payload, str):
+        return {}
+    return {unquote_tag(tag): int(votes) for tag, votes in tag_pair_pattern.findall(payload)}
+
+
+class TagMatrix:
+    """
+    Tag votes of every app as a CSR matrix: the tags of the app in row i are
+    vocabulary[indices[indptr[i]:indptr[i + 1]]], with their votes in data[indptr[i]:indptr[i + 1]].
+    Parameters:
+        appids (numpy.ndarray): Sorted int64 appid of every row.
+        vocabulary (numpy.ndarray): Sorted tag names.
+        indptr (numpy.ndarray): int64 offsets of the rows in indices and data, of length len(appids) + 1.
+        indices (numpy.ndarray): int32 vocabulary position of every vote count.
+        data (numpy.ndarray): int32 vote counts.
+    """
+
+    def __init__(self, appids, vocabulary, indptr, indices, data):
+        self.appids = appids
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @property
+    def shape(self):
+        return len(self.appids), len(self.vocabulary)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.appids, self.vocabulary, self.indptr, self.indices, self.data))
+
+    @property
+    def rows(self):
+        """
+        Row of every vote count, i.e., the expanded indptr.
+        """
+        return np.repeat(np.arange(len(self.appids)), np.diff(self.indptr))
+
+    def __len__(self):
+        return len(self.appids)
+
+    def __repr__(self):
+        return f'TagMatrix({self.shape[0]} apps x {self.shape[1]} tags, {len(self.data)} votes)'
+
+    def tag_code(self, tag):
+        """
+        Position of a tag in the vocabulary.
+        Raises:
+            KeyError: If no app carries the tag.
+        """
+        code = np.searchsorted(self.vocabulary, tag)
+        if code == len(self.vocabulary) or self.vocabulary[code] != tag:
+            raise KeyError(f"Unknown tag '{tag}'")
+        return int(code)
+
+    def tag_counts(self):
+        """
+        Number of apps carrying each tag.
+        Returns:
+            pandas.Series: App count per tag, indexed by tag, most common first.
+        """
+        counts = np.bincount(self.indices, minlength=len(self.vocabulary))
+        return pd.Series(counts, index=self.vocabulary, name='apps').sort_values(ascending=False, kind='stable')
+
+    def top_tags(self, n=5):
+        """
+        Most voted tags of every app.
+        Parameters:
+            n (int, optional): Number of tags per app (default is 5).
+        Returns:
+            pandas.DataFrame: One row per app and tag with 'appid', 'rank' (1 is the most voted), 'tag' and 'votes'.
+        """
+        rows = self.rows
+        order = np.lexsort((-self.data, rows))
+        rows = rows[order]
+        ranks = np.arange(len(order)) - self.indptr[rows]
+        keep = ranks < n
+        return pd.DataFrame({
+            'appid': self.appids[rows[keep]],
+            'rank': (ranks[keep] + 1).astype(np.int32),
+            'tag': pd.Categorical.from_codes(self.indices[order][keep], self.vocabulary),
+            'votes': self.data[order][keep],
+        })
+
+    def apps_with_tag(self, tag, min_votes=1):
+        """
+        Apps carrying a tag.
+        Parameters:
+            tag (str): Tag name, e.g. 'Indie'.
+            min_votes (int, optional): Minimum number of votes of the tag (default is 1).
+        Returns:
+            pandas.Series: Votes of the tag, indexed by appid in ascending order.
+        """
+        mask = (self.indices == self.tag_code(tag)) & (self.data >= min_votes)
+        return pd.Series(self.data[mask], index=pd.Index(self.appids[self.rows[mask]], name='appid'), name=tag)
+
+    def cooccurrence(self, chunk_size=50_000):
+        """
+        Number of apps carrying both tags of every pair, the diagonal being the app count of each tag.
+        Rows are expanded to dense 0/1 blocks of chunk_size apps and multiplied, so memory stays bounded.
+        Parameters:
+            chunk_size (int, optional): Apps per block (default is 50,000).
+        Returns:
+            pandas.DataFrame: Symmetric tag-by-tag counts, indexed and labelled by tag.
+        """
+        counts = np.zeros((len(self.vocabulary), len(self.vocabulary)), dtype=np.int64)
+        rows = self.rows
+        for start in range(0, len(self.appids), chunk_size):
+            begin, end = self.indptr[start], self.indptr[min(start + chunk_size, len(self.appids))]
+            block = np.zeros((min(chunk_size, len(self.appids) - start), len(self.vocabulary)), dtype=np.float32)
+            block[rows[begin:end] - start, self.indices[begin:end]] = 1
+            # float32 sums are exact up to 2 ** 24, far above chunk_size
+            counts += (block.T @ block).astype(np.int64)
+        return pd.DataFrame(counts, index=self.vocabulary, columns=self.vocabulary)
+
+    def to_scipy(self):
+        """
+        Converts to a scipy.sparse.csr_matrix, requires scipy.
+        """
+        from scipy import sparse
+
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    def save(self, path):
+        """
+        Writes the matrix to a compressed .npz file, see load.
+        Parameters:
+            path (str): Output file, '.npz' is appended if missing.
+        """
+        np.savez_compressed(path, appids=self.appids, vocabulary=self.vocabulary, indptr=self.indptr,
+                            indices=self.indices, data=self.data)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a matrix written by save.
+        Parameters:
+            path (str): The .npz file.
+        Returns:
+            TagMatrix: The matrix.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(*(arrays[key] for key in ['appids', 'vocabulary', 'indptr', 'indices', 'data']))
+
+
+def build_tag_matrix(appids, payloads):
+    """
+    Parses the SteamSpy tags payloads into a TagMatrix. Each quoted tag is decoded once for the vocabulary,
+    not once per app.
+    Parameters:
+        appids (pandas.Series): Appid of every payload.
+        payloads (pandas.Series): Stringified dicts of tag votes, e.g. df_steamspy['tags'].
+    Returns:
+        TagMatrix: Tag votes of every app, rows sorted by appid.
+    """
+    appids = appids.to_numpy(dtype=np.int64)
+    order = np.argsort(appids, kind='stable')
+    pairs = [tag_pair_pattern.findall(payload) if isinstance(payload, str) else []
+             for payload in payloads.to_numpy(dtype=object)[order]]
+    indptr = np.zeros(len(pairs) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in pairs], out=indptr[1:])
+    flat = list(itertools.chain.from_iterable(pairs))
+    quoted_codes, quoted = pd.factorize(np.array([tag for tag, _ in flat], dtype=object))
+    # The same tag may be quoted differently, merging them after unquoting
+    vocabulary, codes = np.unique(np.array([unquote_tag(tag) for tag in quoted], dtype=str), return_inverse=True)
+    indices = codes.astype(np.int32)[quoted_codes] if len(flat) else np.zeros(0, dtype=np.int32)
+    data = np.array([votes for _, votes in flat], dtype=np.int64).astype(np.int32)
+
+    # Canonical CSR: tags sorted within each row
+    rows = np.repeat(np.arange(len(pairs)), np.diff(indptr))
+    within = np.lexsort((indices, rows))
+    return TagMatrix(appids[order], vocabulary, indptr, indices[within], data[within])
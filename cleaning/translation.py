@@ -0,0 +1,255 @@
+# Translation of the text left in other languages after cleaning
+# Only distinct strings are translated, results are kept in an on-disk cache keyed by (text, source, target),
+# and requests are batched and sent concurrently through a pluggable backend
+import abc
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TranslationCache:
+    """
+    On-disk key-value store of translations, keyed by (text, source, target). Strings a backend could not translate
+    are stored as well, keyed by backend, so that re-runs do not send them again while another backend still can.
+    The connection may be used from the worker thread translate_texts falls back to inside a running event loop.
+    Parameters:
+        path (str, optional): SQLite file holding the cache (default is ':memory:', i.e., not persisted).
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS translations '
+                                '(text TEXT, source TEXT, target TEXT, translation TEXT, '
+                                'PRIMARY KEY (text, source, target))')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS misses '
+                                '(text TEXT, source TEXT, target TEXT, backend TEXT, '
+                                'PRIMARY KEY (text, source, target, backend))')
+
+    def _select(self, query, texts, *params):
+        rows = []
+        texts = list(texts)
+        for start in range(0, len(texts), 500):
+            batch = texts[start:start + 500]
+            rows += self.connection.execute(query + f" AND text IN ({', '.join('?' * len(batch))})",
+                                            [*params, *batch]).fetchall()
+        return rows
+
+    def get_many(self, texts, source, target):
+        """
+        Looks up cached translations.
+        Parameters:
+            texts (list): Strings to look up.
+            source (str): Source language code.
+            target (str): Target language code.
+        Returns:
+            dict: Translation of every string found in the cache.
+        """
+        return dict(self._select('SELECT text, translation FROM translations WHERE source = ? AND target = ?',
+                                 texts, source, target))
+
+    def get_misses(self, texts, source, target, backend):
+        """
+        Looks up the strings a backend could not translate before.
+        Parameters:
+            texts (list): Strings to look up.
+            source (str): Source language code.
+            target (str): Target language code.
+            backend (str): Name of the backend, see TranslationBackend.name.
+        Returns:
+            set: The strings the backend could not translate.
+        """
+        return {text for text, in self._select('SELECT text FROM misses WHERE source = ? AND target = ? '
+                                               'AND backend = ?', texts, source, target, backend)}
+
+    def set_many(self, translations, source, target, backend=None):
+        """
+        Stores translations.
+        Parameters:
+            translations (dict): Translation of every string, None for strings the backend could not translate.
+            source (str): Source language code.
+            target (str): Target language code.
+            backend (str, optional): Name of the backend, needed to store untranslated strings (default is None).
+        """
+        rows = [(text, source, target, translation) for text, translation in translations.items()
+                if translation is not None]
+        misses = [(text, source, target, backend) for text, translation in translations.items()
+                  if translation is None]
+        if misses and backend is None:
+            raise ValueError('Storing untranslated strings requires the name of the backend')
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)', rows)
+            self.connection.executemany('INSERT OR REPLACE INTO misses VALUES (?, ?, ?, ?)', misses)
+
+    def close(self):
+        self.connection.close()
+
+
+class TranslationBackend(abc.ABC):
+    """
+    Interface of the translation services. Subclasses translate a batch of strings.
+    """
+    # Strings per call of translate_batch, unless translate_texts_async is given another batch_size
+    batch_size = 50
+
+    @property
+    def name(self):
+        """
+        Key of the strings this backend could not translate in the TranslationCache.
+        """
+        return type(self).__name__
+
+    @abc.abstractmethod
+    async def translate_batch(self, texts, source, target):
+        """
+        Parameters:
+            texts (list): Strings to translate.
+            source (str): Source language code, or 'auto'.
+            target (str): Target language code.
+        Returns:
+            list: Translations in the same order, None for strings the service cannot translate.
+        """
+
+
+class DictionaryBackend(TranslationBackend):
+    """
+    Offline backend translating from a fixed dictionary, for offline runs and tests.
+    Strings missing from the dictionary are not translated (None).
+    Parameters:
+        dictionary (dict, optional): Translation of every known string (default is an empty dictionary).
+    """
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary or {}
+        self.calls = 0
+
+    async def translate_batch(self, texts, source, target):
+        self.calls += 1
+        return [self.dictionary.get(text) for text in texts]
+
+
+class TranslatorsBackend(TranslationBackend):
+    """
+    Online backend using the 'translators' package, one request per string run in a worker thread.
+    A failed request, e.g. rate limited, gives None like an untranslatable string.
+    Parameters:
+        translator (str, optional): Service used by the 'translators' package (default is 'bing').
+    """
+    # Every call is one request, so that the concurrency of translate_texts_async bounds the requests in flight
+    batch_size = 1
+
+    def __init__(self, translator='bing'):
+        import translators
+
+        self.translators = translators
+        self.translator = translator
+
+    @property
+    def name(self):
+        return f'translators.{self.translator}'
+
+    def translate_text(self, text, source, target):
+        try:
+            return self.translators.translate_text(query_text=text, translator=self.translator,
+                                                   from_language=source, to_language=target)
+        except Exception:
+            return None
+
+    async def translate_batch(self, texts, source, target):
+        return [await asyncio.to_thread(self.translate_text, text, source, target) for text in texts]
+
+
+async def translate_texts_async(texts, backend, cache, source='auto', target='en', batch_size=None, concurrency=4,
+                                retry_misses=False):
+    """
+    Translates distinct strings, sending only the ones missing from the cache, in concurrent batches.
+    Strings the backend cannot translate are cached as misses of that backend and not sent to it again,
+    another backend may still translate them.
+    Parameters:
+        texts (iterable): Strings to translate, duplicates are translated once.
+        backend (TranslationBackend): Translation service.
+        cache (TranslationCache): Cache of previous translations.
+        source (str, optional): Source language code (default is 'auto').
+        target (str, optional): Target language code (default is 'en').
+        batch_size (int, optional): Strings per backend call (default is the batch_size of the backend).
+        concurrency (int, optional): Maximum number of backend calls running at once (default is 4).
+        retry_misses (bool, optional): Whether to send the strings the backend could not translate before again,
+                                       e.g. after failed requests (default is False).
+    Returns:
+        dict: Translation of every distinct string that could be translated.
+    """
+    texts = list(dict.fromkeys(text for text in texts if isinstance(text, str) and text.strip()))
+    translations = cache.get_many(texts, source, target)
+    skipped = set() if retry_misses else cache.get_misses(texts, source, target, backend.name)
+    missing = [text for text in texts if text not in translations and text not in skipped]
+    batch_size = batch_size or backend.batch_size
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def translate(batch):
+        async with semaphore:
+            result = dict(zip(batch, await backend.translate_batch(batch, source, target)))
+        cache.set_many(result, source, target, backend.name)
+        return {text: translation for text, translation in result.items() if translation is not None}
+
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    for result in await asyncio.gather(*[translate(batch) for batch in batches]):
+        translations.update(result)
+    return translations
+
+
+def translate_texts(texts, backend, cache, **kwargs):
+    """
+    Synchronous wrapper of translate_texts_async, see there for the parameters. Inside a running event loop,
+    e.g. in Jupyter, where asyncio.run is not allowed, the translation runs in its own loop in a worker thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(translate_texts_async(texts, backend, cache, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, translate_texts_async(texts, backend, cache, **kwargs)).result()
+
+
+def collect_untranslated(df, columns, mask=None):
+    """
+    Collects the distinct strings of every column that need translation.
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        columns (list): Text columns, list values are split into their elements.
+        mask (pandas.Series, optional): Rows to translate, e.g. from script flags (default is None, i.e., all rows).
+    Returns:
+        dict: Distinct strings of every column.
+    """
+    rows = df if mask is None else df[mask]
+    collected = {}
+    for col in columns:
+        values = rows[col].astype(object).explode() if rows[col].map(type).eq(list).any() else rows[col]
+        collected[col] = values.dropna().astype(str).unique().tolist()
+    return collected
+
+
+def translate_columns(df, columns, backend, cache, mask=None, suffix='_en', **kwargs):
+    """
+    Translates text columns, adding a '<column>_en' column. Every distinct string is translated once,
+    strings that cannot be translated keep their text.
+    Parameters:
+        df (pandas.DataFrame): The input DataFrame.
+        columns (list): Text columns to translate.
+        backend (TranslationBackend): Translation service.
+        cache (TranslationCache): Cache of previous translations.
+        mask (pandas.Series, optional): Rows to translate; other rows keep their text (default is None, i.e., all).
+        suffix (str, optional): Suffix of the translated columns (default is '_en').
+        **kwargs: Passed to translate_texts_async (source, target, batch_size, concurrency, retry_misses).
+    Returns:
+        pandas.DataFrame: A new DataFrame with the translated columns, the input is left unchanged.
+    """
+    collected = collect_untranslated(df, columns, mask)
+    translations = translate_texts([text for texts in collected.values() for text in texts], backend, cache, **kwargs)
+    rows = df.index if mask is None else df.index[mask.to_numpy()]
+    translated_columns = {}
+    for col in columns:
+        translated = df[col].astype(object).copy()
+        translated[rows] = translated[rows].map(
+            lambda value: [translations.get(str(v), v) for v in value] if isinstance(value, list)
+            else translations.get(value, value) if isinstance(value, str) else value)
+        translated_columns[col + suffix] = translated
+    return df.assign(**translated_columns)
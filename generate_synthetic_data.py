@@ -0,0 +1,298 @@
+# Generator of synthetic steam_app_data.csv and steamspy_app_data.csv files
+# Payloads mimic the scraped data: stringified dicts and lists, HTML-laden descriptions, nested package groups,
+# localized and Chinese release dates, apostrophes inside tags and achievements, and missing fields
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+words = ['space', 'dungeon', 'legend', 'tactics', 'farm', 'racing', 'puzzle', 'shadow', 'empire', 'quest',
+         'pixel', 'zombie', 'ocean', 'star', 'knight', 'city', 'rogue', 'sim', 'galaxy', 'craft']
+chinese_words = ['传说', '三国', '修仙', '江湖', '战记', '物语']
+languages = ['English', 'French', 'Italian', 'German', 'Spanish - Spain', 'Japanese', 'Korean', 'Polish',
+             'Portuguese - Brazil', 'Russian', 'Simplified Chinese', 'Traditional Chinese', 'Turkish', 'Czech']
+months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+german_months = ['Jan.', 'Feb.', 'März', 'Apr.', 'Mai', 'Juni', 'Juli', 'Aug.', 'Sep.', 'Okt.', 'Nov.', 'Dez.']
+tags = ['Action', 'Indie', 'Adventure', 'RPG', 'Strategy', 'Casual', 'Simulation', "Shoot 'Em Up", 'Co-op',
+        'Pixel Graphics', 'Roguelike', 'Open World', "Beat 'em up", 'Singleplayer', 'Multiplayer', 'Anime']
+genres = ['Action', 'Indie', 'Action, Indie', 'Adventure, Indie', 'Casual, Indie', 'RPG, Strategy', 'Simulation']
+owner_ranges = ['0 .. 20,000', '20,000 .. 50,000', '50,000 .. 100,000', '100,000 .. 200,000',
+                '200,000 .. 500,000', '500,000 .. 1,000,000', '1,000,000 .. 2,000,000']
+owner_weights = [0.6, 0.15, 0.1, 0.07, 0.04, 0.03, 0.01]
+
+
+def choose(rng, values, size, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=p)]
+
+
+def generate_names(rng, n):
+    first = choose(rng, words, n)
+    second = choose(rng, words, n)
+    names = np.char.add(np.char.add(np.char.capitalize(first.astype(str)), ' '),
+                        np.char.capitalize(second.astype(str)))
+    names = names.astype(object) + ' ' + rng.integers(0, n, n).astype(str).astype(object)
+    chinese = rng.random(n) < 0.03
+    names[chinese] = (choose(rng, chinese_words, chinese.sum()) + choose(rng, chinese_words, chinese.sum())
+                      + rng.integers(0, n, chinese.sum()).astype(str).astype(object))
+    # Re-releases and soundtracks share the name of another app
+    duplicates = rng.random(n) < 0.01
+    names[duplicates] = names[rng.integers(0, n, duplicates.sum())]
+    return names
+
+
+def generate_release_dates(rng, n):
+    day = rng.integers(1, 29, n)
+    month = rng.integers(0, 12, n)
+    year = rng.integers(2006, 2024, n)
+    kind = rng.choice(7, n, p=[0.45, 0.25, 0.08, 0.06, 0.04, 0.07, 0.05])
+    dates = []
+    for d, m, y, k in zip(day, month, year, kind):
+        if k == 0:
+            date = f'{d} {months[m]}, {y}'
+        elif k == 1:
+            date = f'{months[m]} {d}, {y}'
+        elif k == 2:
+            date = f'{months[m]} {y}'
+        elif k == 3:
+            date = f'{y} 年 {m + 1} 月 {d} 日'
+        elif k == 4:
+            date = f'{d}. {german_months[m]} {y}'
+        elif k == 5:
+            date = 'Coming soon'
+        else:
+            date = ''
+        dates.append(f"{{'coming_soon': {k == 5}, 'date': '{date}'}}")
+    return dates
+
+
+def generate_languages(rng, n):
+    values = []
+    for count in rng.integers(1, 8, n):
+        chosen = rng.choice(len(languages), count, replace=False)
+        audio = rng.random(count) < 0.3
+        parts = [languages[i] + ('<strong>*</strong>' if a else '') for i, a in zip(chosen, audio)]
+        footnote = '<br><strong>*</strong>languages with full audio support' if audio.any() else ''
+        values.append(', '.join(parts) + footnote)
+    return values
+
+
+def generate_requirements(rng, n):
+    values = []
+    for memory, storage, directx, network in zip(rng.choice([1, 2, 4, 8, 16], n), rng.integers(1, 150, n),
+                                                 rng.choice([9, 10, 11, 12], n), rng.random(n) < 0.4):
+        def block(title, scale):
+            items = [f'<li><strong>OS:</strong> Windows {7 + scale}<br></li>',
+                     f'<li><strong>Processor:</strong> Intel Core i{3 + 2 * scale} or equivalent<br></li>',
+                     f'<li><strong>Memory:</strong> {memory * (1 + scale)} GB RAM<br></li>',
+                     '<li><strong>Graphics:</strong> NVIDIA GeForce GTX 660 &amp; up<br></li>',
+                     f'<li><strong>DirectX:</strong> Version {directx}<br></li>']
+            if network:
+                items.append('<li><strong>Network:</strong> Broadband Internet connection<br></li>')
+            items.append(f'<li><strong>Storage:</strong> {storage * (1 + scale)} GB available space</li>')
+            return f'<strong>{title}:</strong><br><ul class=\\"bb_ul\\">' + ''.join(items) + '</ul>'
+        if memory == 16:
+            values.append('[]')
+        else:
+            values.append(f"{{'minimum': '{block('Minimum', 0)}', 'recommended': '{block('Recommended', 1)}'}}")
+    return values
+
+
+def generate_package_groups(rng, appids, names, prices):
+    values = []
+    for appid, name, price, n_subs in zip(appids, names, prices, rng.choice([0, 1, 2, 3], len(appids),
+                                                                           p=[0.15, 0.6, 0.15, 0.1])):
+        if n_subs == 0:
+            values.append('[]')
+            continue
+        subs = []
+        for i in range(n_subs):
+            sub_price = int(price) * (i + 1)
+            option = (f'{name} - ${sub_price / 100:.2f}' if i == 0 else
+                      f'{name} - Deluxe Edition <span class="discount_original_price">${sub_price / 80:.2f}</span> '
+                      f'- ${sub_price / 100:.2f}')
+            option = option.replace("'", "\\'")
+            subs.append(f"{{'packageid': {appid * 10 + i}, 'percent_savings_text': ' ', 'percent_savings': 0, "
+                        f"'option_text': '{option}', 'option_description': '', 'can_get_free_license': '0', "
+                        f"'is_free_license': {sub_price == 0}, 'price_in_cents_with_discount': {sub_price}}}")
+        values.append("[{'name': 'default', 'title': 'Buy', 'description': '', 'selection_text': 'Select a "
+                      "purchase option', 'save_text': '', 'display_type': 0, 'is_recurring_subscription': 'false', "
+                      f"'subs': [{', '.join(subs)}]}}]")
+    return values
+
+
+def generate_steam_chunk(rng, appids):
+    """
+    Generates raw Steam app data for the given appids.
+    Parameters:
+        rng (numpy.random.Generator): Random generator.
+        appids (numpy.ndarray): Appids of the chunk.
+    Returns:
+        pandas.DataFrame: Data in the format of steam_app_data.csv.
+    """
+    n = len(appids)
+    names = generate_names(rng, n)
+    is_free = rng.random(n) < 0.1
+    prices = np.where(is_free, 0, choose(rng, [99, 499, 999, 1499, 1999, 2999, 5999], n))
+    price_missing = is_free | (rng.random(n) < 0.05)
+    currencies = choose(rng, ['USD', 'USD', 'USD', 'EUR', 'GBP'], n)
+    developers = choose(rng, [f'{w.capitalize()} Studio' for w in words] + ["Devolver's Friends", 'Solo Dev'], n)
+    publishers = choose(rng, ['Devolver Digital', 'Team17', 'Self-published', 'Paradox Interactive'], n)
+    descriptions = choose(rng, ['<h1>About</h1><p>A game about {} &amp; {}.</p><br><img src="x.png">',
+                                '<p><strong>{}</strong> meets {} in this &quot;unique&quot; adventure.</p>',
+                                '<ul class="bb_ul"><li>{}</li><li>{}</li></ul>'], n)
+    detailed = [template.format(a, b) * 5 for template, a, b in zip(descriptions, names, choose(rng, words, n))]
+    n_achievements = rng.integers(0, 200, n)
+    frame = pd.DataFrame({
+        'type': 'game',
+        'name': names,
+        'steam_appid': appids,
+        'required_age': choose(rng, [0, 0, 0, 13, 16, 18], n),
+        'is_free': is_free,
+        'controller_support': np.where(rng.random(n) < 0.3, 'full', None),
+        'dlc': np.where(rng.random(n) < 0.2, [f'[{a + 1}]' for a in appids], None),
+        'detailed_description': detailed,
+        'about_the_game': [d[:400] for d in detailed],
+        'short_description': [f'{name} &amp; friends <b>now</b> on Steam' for name in names],
+        'fullgame': None,
+        'supported_languages': generate_languages(rng, n),
+        'header_image': [f'https://cdn.example.com/steam/apps/{a}/header.jpg' for a in appids],
+        'website': np.where(rng.random(n) < 0.6, 'https://example.com', None),
+        'pc_requirements': generate_requirements(rng, n),
+        'mac_requirements': '[]',
+        'linux_requirements': '[]',
+        'legal_notice': None,
+        'drm_notice': None,
+        'ext_user_account_notice': None,
+        'developers': [f"['{d}']" if "'" not in d else f'["{d}"]' for d in developers],
+        'publishers': [f"['{p}']" for p in publishers],
+        'demos': None,
+        'price_overview': [None if missing else
+                           f"{{'currency': '{c}', 'initial': {p}, 'final': {p}, 'discount_percent': 0, "
+                           f"'initial_formatted': '', 'final_formatted': '${p / 100:.2f}'}}"
+                           for missing, c, p in zip(price_missing, currencies, prices)],
+        'packages': [f'[{a * 10}]' for a in appids],
+        'package_groups': generate_package_groups(rng, appids, names, prices),
+        'platforms': [f"{{'windows': True, 'mac': {m}, 'linux': {l}}}"
+                      for m, l in zip(rng.random(n) < 0.2, rng.random(n) < 0.15)],
+        'metacritic': None,
+        'reviews': None,
+        'categories': choose(rng, ["[{'id': 2, 'description': 'Single-player'}]",
+                                   "[{'id': 1, 'description': 'Multi-player'}, {'id': 9, 'description': 'Co-op'}]"], n),
+        'genres': choose(rng, ["[{'id': '1', 'description': 'Action'}]", "[{'id': '23', 'description': 'Indie'}]"], n),
+        'screenshots': "[{'id': 0, 'path_thumbnail': 'https://cdn.example.com/ss_0.jpg'}]",
+        'movies': np.where(rng.random(n) < 0.7, "[{'id': 1, 'name': 'Trailer'}]", None),
+        'recommendations': None,
+        'achievements': [None if total == 0 else
+                         f"{{'total': {total}, 'highlighted': [{{'name': \"Don't Panic\", 'path': 'a.jpg'}}]}}"
+                         for total in n_achievements],
+        'release_date': generate_release_dates(rng, n),
+        'support_info': "{'url': '', 'email': 'support@example.com'}",
+        'background': 'https://cdn.example.com/bg.jpg',
+        'content_descriptors': "{'ids': [], 'notes': None}",
+    })
+    # A few apps come back from the scraper with most fields missing
+    broken = rng.random(n) < 0.002
+    frame.loc[broken, ['supported_languages', 'header_image', 'support_info']] = None
+    return frame
+
+
+def generate_steamspy_chunk(rng, appids, names):
+    """
+    Generates raw SteamSpy data for the given apps, a few percent of the apps are missing
+    and a few apps miss a vote count, so that some shards have gaps in integer columns.
+    Parameters:
+        rng (numpy.random.Generator): Random generator.
+        appids (numpy.ndarray): Appids of the chunk.
+        names (numpy.ndarray): Names of the apps.
+    Returns:
+        pandas.DataFrame: Data in the format of steamspy_app_data.csv.
+    """
+    present = rng.random(len(appids)) < 0.97
+    appids, names = appids[present], names[present]
+    n = len(appids)
+    no_votes = rng.random(n) < 0.001
+    tag_values = []
+    for count in rng.integers(0, 8, n):
+        chosen = rng.choice(len(tags), count, replace=False)
+        items = [f'"{tags[i]}": {v}' if "'" in tags[i] else f"'{tags[i]}': {v}"
+                 for i, v in zip(chosen, rng.integers(1, 5000, count))]
+        tag_values.append('{' + ', '.join(items) + '}' if count else '[]')
+    return pd.DataFrame({
+        'appid': appids,
+        'name': names,
+        'developer': 'Unknown',
+        'publisher': 'Unknown',
+        'score_rank': None,
+        'positive': np.where(no_votes, None, rng.integers(0, 100_000, n)),
+        'negative': rng.integers(0, 20_000, n),
+        'userscore': 0,
+        'owners': choose(rng, owner_ranges, n, p=owner_weights),
+        'average_forever': rng.integers(0, 5000, n),
+        'average_2weeks': rng.integers(0, 500, n),
+        'median_forever': rng.integers(0, 5000, n),
+        'median_2weeks': rng.integers(0, 500, n),
+        'price': rng.integers(0, 6000, n),
+        'initialprice': rng.integers(0, 6000, n),
+        'discount': 0,
+        'languages': 'English',
+        'genre': choose(rng, genres, n),
+        'ccu': rng.integers(0, 10_000, n),
+        'tags': tag_values,
+    })
+
+
+def write_shard(df, path, compression):
+    """
+    Writes a chunk as its own compressed CSV shard, zstd through pyarrow so that zstandard is not needed.
+    """
+    if compression != 'zstd':
+        df.to_csv(path, index=False, compression=compression)
+        return
+    import pyarrow as pa
+
+    with pa.output_stream(path, compression='zstd') as stream:
+        df.to_csv(stream, index=False)
+
+
+def write_synthetic_data(n_apps, output_dir='data/download', chunk_size=100_000, seed=0, compression=None):
+    """
+    Writes steam_app_data.csv and steamspy_app_data.csv with n_apps apps, chunk by chunk,
+    or one compressed shard per chunk as the scraper does, e.g. steam_app_data-00000.csv.gz.
+    Parameters:
+        n_apps (int): Number of apps.
+        output_dir (str, optional): Output directory (default is 'data/download').
+        chunk_size (int, optional): Apps generated at once (default is 100 000).
+        seed (int, optional): Random seed (default is 0).
+        compression (str, optional): 'gzip' or 'zstd' to write shards (default is None, i.e., single CSV files).
+    Returns:
+        tuple: Paths of the Steam and SteamSpy files, or globs of their shards.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    suffix = '.csv' if compression is None else '-{:05d}.csv.' + {'gzip': 'gz', 'zstd': 'zst'}[compression]
+    steam_path = os.path.join(output_dir, 'steam_app_data' + suffix)
+    steamspy_path = os.path.join(output_dir, 'steamspy_app_data' + suffix)
+    for i, start in enumerate(range(0, n_apps, chunk_size)):
+        appids = np.arange(start, min(start + chunk_size, n_apps), dtype=np.int64) * 10 + 10
+        steam = generate_steam_chunk(rng, appids)
+        steamspy = generate_steamspy_chunk(rng, appids, steam['name'].to_numpy())
+        if compression:
+            write_shard(steam, steam_path.format(i), compression)
+            write_shard(steamspy, steamspy_path.format(i), compression)
+            continue
+        steam.to_csv(steam_path, mode='a' if start else 'w', header=not start, index=False)
+        steamspy.to_csv(steamspy_path, mode='a' if start else 'w', header=not start, index=False)
+    if compression:
+        return steam_path.replace('{:05d}', '*'), steamspy_path.replace('{:05d}', '*')
+    return steam_path, steamspy_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic Steam and SteamSpy scrapes.')
+    parser.add_argument('--apps', type=int, default=10_000, help='number of apps, 10k to 10M')
+    parser.add_argument('--output-dir', default='data/download')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='apps per chunk, i.e., per shard')
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], help='write compressed shards instead of one CSV')
+    args = parser.parse_args()
+    print(write_synthetic_data(args.apps, args.output_dir, args.chunk_size, args.seed, args.compression))